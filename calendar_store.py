@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+"""
+Reading and writing the calendar (events_by_day.json) for the scrapers.
+
+The calendar the site reads maps each day to a full copy of every event on it,
+so a Teleticket run spanning months is repeated once per day. The normalized
+format stores each event once, with its first and last date, plus a compact
+day -> [event ids] index:
+
+  {"format": "normalized", "version": 1,
+   "events": {"<id>": {"first": "2026-03-01", "last": "2026-03-31", "event": {...}}},
+   "days": {"2026-03-01": ["<id>", ...], ...}}
+
+An event's id comes from its source, URL and title; placements of the same
+event whose fields differ (e.g. another time on one day) get their own id with
+a "-2", "-3" suffix, so expand(normalize(c)) == c exactly, day order included.
+
+For lazy loading, the calendar is also split into month shards under
+calendar/: one events_by_day-shaped file per month from the current month on
+(calendar/2026-03.json), and one archive shard per year for the months before
+it (calendar/archive-2026.json), compacted into the normalized format.
+calendar/manifest.json lists every shard with its format, the months it
+covers, its sha256, day / event counts and size, so a page can
+fetch the current window first and the rest on demand, using the hash to
+cache. Shards whose content did not change are not rewritten.
+
+write_calendar() writes the formats listed in CALENDAR_FORMATS
+(comma-separated, default "legacy,shards"): "legacy" is events_by_day.json as
+before, "normalized" adds events_by_day.normalized.json, "shards" the month
+shards and manifest. load_calendar() accepts either single-file format.
+
+Storage is partitioned by source: data/sources/{enlima,eventbrite,teleticket}.json
+(plus other.json for events from none of them) each hold one source's
+events_by_day slice, in the normalized format. A scraper replaces only its
+own partition with update_source(), which reads the partition fresh under its
+lock, applies the scraper's merge and writes it back, so its cost is that of
+its own events and a failed source leaves the others untouched. write_view()
+then rebuilds the merged calendar (events_by_day.json and the shards) from
+all partitions, in PARTITIONS order per day. The first use splits an existing
+events_by_day.json into partitions. Each update_source() also records the
+events it added, removed and changed in the change_log feed.
+
+Every file is written in a canonical form: days in date order, each day's
+events sorted by time, title and URL (the site sorts by time itself), keys
+sorted. A file whose content did not change is not rewritten, so an hourly run
+that found nothing new produces no diff and no commit.
+
+Every file is written atomically and read-modify-writes hold a lock
+(file_store), so overlapping runs take turns instead of losing each other's
+events. With EVENT_STORE=sqlite the partitions live in event_store's SQLite
+database, and write_view() exports both the calendar files and data/sources/
+from it, so the committed partitions stay current in either mode.
+"""
+import hashlib
+import json
+import os
+import re
+from datetime import date
+from pathlib import Path
+
+import change_log
+import event_store
+import file_store
+
+EVENTS_FILE = Path(__file__).resolve().parent / "events_by_day.json"
+SHARDS_DIR = Path(__file__).resolve().parent / "calendar"
+SOURCES_DIR = Path(__file__).resolve().parent / "data" / "sources"
+# Partitions in the order their events appear on each day of the merged view
+PARTITIONS = ("enlima", "other", "eventbrite", "teleticket")
+OTHER = "other"
+MANIFEST = "manifest.json"
+FORMAT = "normalized"
+VERSION = 1
+TIME_RE = re.compile(r"(\d{1,2}):(\d{2})\s*([ap])?\.?m?", re.IGNORECASE)
+FORMATS = {f.strip() for f in os.environ.get("CALENDAR_FORMATS", "legacy,shards").split(",") if f.strip()}
+
+
+def time_minutes(t):
+    """Minutes after midnight for "10:00 am" / "19:30" (as the site's timeToMinutes), 9999 if none."""
+    m = TIME_RE.search(t or "")
+    if not m:
+        return 9999
+    hour, minute = int(m.group(1)), int(m.group(2))
+    ampm = (m.group(3) or "").lower()
+    if ampm == "p":
+        hour = 12 if hour == 12 else hour + 12
+    elif ampm == "a" and hour == 12:
+        hour = 0
+    return hour * 60 + minute if hour < 24 and minute < 60 else 9999
+
+
+def event_sort_key(ev):
+    # The full content breaks ties (same time / title / URL, different venue or price),
+    # so the order never depends on the order events were scraped in
+    return (time_minutes(ev.get("time")), (ev.get("title") or "").strip().casefold(),
+            ev.get("url") or "", ev.get("source") or "", file_store.canonical_json(ev))
+
+
+def canonical_order(events_by_day):
+    """events_by_day with days in date order and each day's events in event_sort_key order."""
+    return {date_key: sorted(events_by_day[date_key], key=event_sort_key) for date_key in sorted(events_by_day)}
+
+
+def normalized_path(path=EVENTS_FILE):
+    path = Path(path)
+    return path.with_name(path.stem + ".normalized.json")
+
+
+def event_id(ev):
+    """Stable id from the event's source, URL and title."""
+    raw = "\n".join((ev.get("source") or "", (ev.get("url") or "").strip(), (ev.get("title") or "").strip()))
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:12]
+
+
+def normalize(events_by_day):
+    """Calendar in the normalized format (see module docstring)."""
+    events = {}
+    days = {}
+    # content -> id, and id(dict) -> id for placements sharing one dict
+    by_content = {}
+    by_object = {}
+    variants = {}
+    for date_key in sorted(events_by_day):
+        ids = days[date_key] = []
+        for ev in events_by_day[date_key]:
+            eid = by_object.get(id(ev))
+            if eid is None:
+                content = json.dumps(ev, sort_keys=True, ensure_ascii=False)
+                eid = by_content.get(content)
+                if eid is None:
+                    base = event_id(ev)
+                    n = variants[base] = variants.get(base, 0) + 1
+                    eid = by_content[content] = base if n == 1 else f"{base}-{n}"
+                    events[eid] = {"first": date_key, "last": date_key, "event": ev}
+                by_object[id(ev)] = eid
+            events[eid]["last"] = date_key
+            ids.append(eid)
+    # Keep the calendar's own day order
+    return {"format": FORMAT, "version": VERSION, "events": events,
+            "days": {date_key: days[date_key] for date_key in events_by_day}}
+
+
+def is_normalized(doc):
+    return isinstance(doc, dict) and doc.get("format") == FORMAT
+
+
+def expand(doc):
+    """events_by_day from a normalized document; placements of one event share its dict."""
+    events = doc["events"]
+    return {date_key: [events[eid]["event"] for eid in ids] for date_key, ids in doc["days"].items()}
+
+
+def load_calendar(path=EVENTS_FILE):
+    """events_by_day from path (either format), or {} if it does not exist."""
+    path = Path(path)
+    if not path.exists():
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        doc = json.load(f)
+    return expand(doc) if is_normalized(doc) else doc
+
+
+def shard_plan(events_by_day, today=None):
+    """
+    [(shard file name, [months], {date_key: events})] in date order: an archive
+    shard per year for months before today's, then one shard per month.
+    """
+    current = (today or date.today()).strftime("%Y-%m")
+    shards = {}
+    for date_key in sorted(events_by_day):
+        month = date_key[:7]
+        name = f"archive-{month[:4]}.json" if month < current else f"{month}.json"
+        months, days = shards.setdefault(name, ([], {}))
+        if not months or months[-1] != month:
+            months.append(month)
+        days[date_key] = events_by_day[date_key]
+    return [(name, months, days) for name, (months, days) in shards.items()]
+
+
+def _load_manifest(directory):
+    try:
+        with open(Path(directory) / MANIFEST, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def write_shards(events_by_day, directory=SHARDS_DIR, today=None):
+    """Write month / archive shards and the manifest; returns the manifest."""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    previous = {s["file"]: s for s in _load_manifest(directory).get("shards", [])}
+    today = today or date.today()
+    shards = []
+    for name, months, days in shard_plan(events_by_day, today):
+        archive = name.startswith("archive-")
+        doc = normalize(days) if archive else days
+        data = file_store.canonical_json(doc, separators=(",", ":"))
+        digest = hashlib.sha256(data).hexdigest()
+        target = directory / name
+        if previous.get(name, {}).get("sha256") != digest or not target.exists():
+            file_store.atomic_write(target, data)
+        shards.append({
+            "file": name,
+            "months": months,
+            "archive": archive,
+            "format": FORMAT if archive else "events_by_day",
+            "sha256": digest,
+            "days": len(days),
+            "events": sum(len(v) for v in days.values()),
+            "bytes": len(data),
+        })
+    # Shards from a previous layout (e.g. a month that became archive)
+    for name in set(previous) - {s["file"] for s in shards}:
+        (directory / name).unlink(missing_ok=True)
+    manifest = {"version": VERSION, "current_month": today.strftime("%Y-%m"), "shards": shards}
+    file_store.write_json_if_changed(directory / MANIFEST, manifest, indent=1)
+    return manifest
+
+
+def write_calendar(events_by_day, path=EVENTS_FILE, formats=None):
+    """
+    Write the calendar, in canonical order, in each of `formats` (default
+    CALENDAR_FORMATS). Returns True if any single-file format changed.
+    """
+    formats = FORMATS if formats is None else formats
+    path = Path(path)
+    events_by_day = canonical_order(events_by_day)
+    changed = False
+    if "legacy" in formats:
+        changed |= file_store.write_json_if_changed(path, events_by_day, indent=2)
+    if "normalized" in formats:
+        changed |= file_store.write_json_if_changed(normalized_path(path), normalize(events_by_day),
+                                                    separators=(",", ":"))
+    if "shards" in formats:
+        write_shards(events_by_day, path.parent / SHARDS_DIR.name)
+    return changed
+
+
+def source_of(ev):
+    """Partition an event belongs to, by its URL (the rule each scraper used to strip its own)."""
+    url = ev.get("url") or ""
+    if "enlima.pe" in url:
+        return "enlima"
+    if "eventbrite" in url:
+        return "eventbrite"
+    if "teleticket.com.pe" in url:
+        return "teleticket"
+    return OTHER
+
+
+def split_by_source(events_by_day):
+    """{partition: events_by_day slice}; days without events stay in the enlima slice."""
+    parts = {name: {} for name in PARTITIONS}
+    for date_key, events in events_by_day.items():
+        if not events:
+            parts["enlima"][date_key] = []
+        for ev in events:
+            parts[source_of(ev)].setdefault(date_key, []).append(ev)
+    return parts
+
+
+def partition_path(name, directory=SOURCES_DIR):
+    return Path(directory) / f"{name}.json"
+
+
+def ensure_partitions(path=EVENTS_FILE, directory=SOURCES_DIR):
+    """Split the calendar at path into source partitions if none exist yet."""
+    directory = Path(directory)
+    if any(partition_path(name, directory).exists() for name in PARTITIONS):
+        return
+    with file_store.locked(path):
+        if any(partition_path(name, directory).exists() for name in PARTITIONS):
+            return
+        directory.mkdir(parents=True, exist_ok=True)
+        for name, part in split_by_source(load_calendar(path)).items():
+            write_partition(name, part, directory)
+        print(f"  Split {Path(path).name} into source partitions in {directory}")
+
+
+def _sqlite_store():
+    """The SQLite store when EVENT_STORE=sqlite (seeded from the calendar on first use), else None."""
+    if not event_store.enabled():
+        return None
+    store = event_store.default_store()
+    if not store.has_calendar():
+        with file_store.locked(EVENTS_FILE):
+            if not store.has_calendar():
+                for name, part in split_by_source(load_calendar(EVENTS_FILE)).items():
+                    store.replace_source(name, part)
+                print(f"  Seeded {store.path} from {EVENTS_FILE.name}")
+    return store
+
+
+def load_partition(name, directory=SOURCES_DIR):
+    """One source's events_by_day slice ({} if it has none)."""
+    store = _sqlite_store()
+    if store:
+        return store.load_source(name)
+    ensure_partitions(directory=directory)
+    return load_calendar(partition_path(name, directory))
+
+
+def write_partition(name, part, directory=SOURCES_DIR):
+    file_store.write_json_if_changed(partition_path(name, directory), normalize(canonical_order(part)), indent=1)
+
+
+def _tracked(name, merge):
+    """merge, wrapped to record the events it added, removed and changed in change_log."""
+    def run(part):
+        before = change_log.index_calendar(part)
+        result = merge(part)
+        delta = change_log.diff_calendar(before, change_log.index_calendar(part))
+        if change_log.record("calendar", name, delta):
+            print(f"  {name}: {', '.join(f'{n} {kind}' for kind, n in change_log.counts(delta).items())}")
+        return result
+    return run
+
+
+def update_source(name, merge, directory=SOURCES_DIR):
+    """
+    Apply merge(partition) to the source's current partition and write it back,
+    under the partition's lock, and log what it changed. Returns merge()'s result.
+    """
+    merge = _tracked(name, merge)
+    store = _sqlite_store()
+    if store:
+        return store.update_source(name, merge)
+    ensure_partitions(directory=directory)
+    path = partition_path(name, directory)
+    with file_store.locked(path):
+        part = load_calendar(path)
+        result = merge(part)
+        write_partition(name, part, directory)
+    return result
+
+
+def merged_view(directory=SOURCES_DIR):
+    """events_by_day of all partitions, days in date order."""
+    store = _sqlite_store()
+    if store:
+        return store.calendar_view(PARTITIONS)
+    days = {}
+    for name in PARTITIONS:
+        for date_key, events in load_partition(name, directory).items():
+            days.setdefault(date_key, []).extend(events)
+    return {date_key: days[date_key] for date_key in sorted(days)}
+
+
+def write_view(path=EVENTS_FILE, directory=SOURCES_DIR):
+    """
+    Rebuild the merged calendar files from the partitions; returns the view.
+    With the SQLite store, the partition files are exported from it too.
+    """
+    # Seeding locks path itself, so it has to happen before taking that lock here
+    store = _sqlite_store()
+    if not store:
+        ensure_partitions(path, directory)
+    with file_store.locked(path):
+        if store:
+            Path(directory).mkdir(parents=True, exist_ok=True)
+            for name in PARTITIONS:
+                write_partition(name, store.load_source(name), directory)
+        view = merged_view(directory)
+        if not write_calendar(view, path):
+            print(f"  {Path(path).name} unchanged; not rewritten")
+    return view
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Append-only feed of what each run changed: changes.jsonl, one JSON line per
+source that changed, e.g.
+
+  {"at": "2026-03-05T14:00:12", "feed": "calendar", "source": "teleticket",
+   "added": [{"id": "3f2a…", "title": "…", "url": "…", "first": "2026-03-07", "last": "2026-03-29", "days": 12}],
+   "removed": [{"id": "…", "title": "…", "url": "…"}],
+   "changed": [{"id": "…", "title": "…", "url": "…", "fields": ["dates", "time"]}]}
+
+Calendar ids are calendar_store.event_id() (source, URL, title); monitor ids
+are its make_event_id(). Runs that change nothing append nothing, so the file
+(and the workflow's commit) stays put. Entries older than CHANGES_KEEP_DAYS
+(default 14), or beyond the newest CHANGES_MAX_ENTRIES (default 500), are
+rotated out when a run appends, so consumers asking "what is new" fetch a few
+kilobytes instead of diffing the full calendar.
+"""
+import json
+import os
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import file_store
+
+CHANGES_FILE = Path(__file__).resolve().parent / "changes.jsonl"
+KEEP_DAYS = int(os.environ.get("CHANGES_KEEP_DAYS", "14"))
+MAX_ENTRIES = int(os.environ.get("CHANGES_MAX_ENTRIES", "500"))
+
+
+def _summary(ev, eid):
+    return {"id": eid, "title": ev.get("title") or "", "url": ev.get("url") or ""}
+
+
+def index_calendar(events_by_day):
+    """{event id: (representative event, [dates], {content of each variant})} of a calendar slice."""
+    import calendar_store
+
+    out = {}
+    for date_key in sorted(events_by_day):
+        for ev in events_by_day[date_key]:
+            eid = calendar_store.event_id(ev)
+            entry = out.get(eid)
+            if entry is None:
+                # A copy, since merges may update events in place
+                entry = out[eid] = (dict(ev), [], set())
+            if not entry[1] or entry[1][-1] != date_key:
+                entry[1].append(date_key)
+            entry[2].add(json.dumps(ev, sort_keys=True, ensure_ascii=False))
+    return out
+
+
+def _values(contents):
+    """{key: set of values} over an event's variants."""
+    values = {}
+    for content in contents:
+        for k, v in json.loads(content).items():
+            values.setdefault(k, set()).add(json.dumps(v, sort_keys=True))
+    return values
+
+
+def diff_calendar(before, after):
+    """{"added", "removed", "changed"} between two index_calendar() results."""
+    delta = {"added": [], "removed": [], "changed": []}
+    for eid in sorted(after.keys() - before.keys()):
+        ev, dates, _ = after[eid]
+        delta["added"].append(dict(_summary(ev, eid), first=dates[0], last=dates[-1], days=len(dates)))
+    for eid in sorted(before.keys() - after.keys()):
+        delta["removed"].append(_summary(before[eid][0], eid))
+    for eid in sorted(before.keys() & after.keys()):
+        old_ev, old_dates, old_content = before[eid]
+        new_ev, new_dates, new_content = after[eid]
+        if old_dates == new_dates and old_content == new_content:
+            continue
+        old_values, new_values = _values(old_content), _values(new_content)
+        fields = ["dates"] if old_dates != new_dates else []
+        fields += sorted(k for k in old_values.keys() | new_values.keys() if old_values.get(k) != new_values.get(k))
+        delta["changed"].append(dict(_summary(new_ev, eid), fields=fields))
+    return delta
+
+
+def diff_events(before, after, volatile=()):
+    """
+    {"added", "removed", "changed"} between two {id: event} maps (monitor's
+    database), ignoring `volatile` keys.
+    """
+    delta = {"added": [], "removed": [], "changed": []}
+    for eid in sorted(after.keys() - before.keys()):
+        delta["added"].append(dict(_summary(after[eid], eid), date=after[eid].get("date") or ""))
+    for eid in sorted(before.keys() - after.keys()):
+        delta["removed"].append(_summary(before[eid], eid))
+    for eid in sorted(before.keys() & after.keys()):
+        old, new = before[eid], after[eid]
+        fields = sorted(k for k in old.keys() | new.keys() if k not in volatile and old.get(k) != new.get(k))
+        if fields:
+            delta["changed"].append(dict(_summary(new, eid), fields=fields))
+    return delta
+
+
+def counts(delta):
+    return {kind: len(delta[kind]) for kind in ("added", "removed", "changed")}
+
+
+def read(path=CHANGES_FILE, since=None):
+    """Entries in the log, oldest first; only those at or after `since` (ISO string) if given."""
+    path = Path(path)
+    if not path.exists():
+        return []
+    entries = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if since is None or entry.get("at", "") >= since:
+                entries.append(entry)
+    return entries
+
+
+def record(feed, source, delta, path=CHANGES_FILE):
+    """Append one entry for source if delta has anything in it; returns whether it did."""
+    if not any(delta[kind] for kind in ("added", "removed", "changed")):
+        return False
+    now = datetime.now()
+    entry = dict(at=now.isoformat(timespec="seconds"), feed=feed, source=source, **delta)
+    line = json.dumps(entry, ensure_ascii=False, sort_keys=True, separators=(",", ":")) + "\n"
+    path = Path(path)
+    with file_store.locked(path):
+        entries = read(path)
+        cutoff = (now - timedelta(days=KEEP_DAYS)).isoformat(timespec="seconds")
+        keep = [e for e in entries if e.get("at", "") >= cutoff][-(MAX_ENTRIES - 1):] if MAX_ENTRIES > 1 else []
+        if len(keep) == len(entries):
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(line)
+        else:
+            # Rotate: rewrite the retained tail plus the new entry
+            lines = [json.dumps(e, ensure_ascii=False, sort_keys=True, separators=(",", ":")) + "\n" for e in keep]
+            file_store.atomic_write(path, "".join(lines) + line)
+    return True
@@ -2,58 +2,80 @@
 """
 Scrape EnLima agenda by day and output events_by_day.json for the calendar.
 Fetches https://enlima.pe/calendario-cultural/dia/YYYY-MM-DD for full year 2026.
+
+The crawl is incremental: each day's parsed events are kept in
+.cache/enlima_days.json with the time they were fetched. Past days are frozen,
+days within the horizon (next 14 days) are re-fetched every run, and later days
+once their copy is older than --far-every-hours.
+
+  python3 enlima_calendar.py                                 # incremental run
+  python3 enlima_calendar.py --full                          # re-fetch every day
+  python3 enlima_calendar.py --days 2026-03-07,2026-03-08    # hot refresh of some days
+  python3 enlima_calendar.py --from 2026-03-01 --to 2026-03-31
+  python3 enlima_calendar.py --workers 1                     # one page at a time
 """
+import argparse
 import json
+import os
 import re
 import sys
-import time as time_module
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
 from pathlib import Path
 
 try:
     import requests
-    from bs4 import BeautifulSoup
+    from bs4 import BeautifulSoup, SoupStrainer
 except ImportError:
     import subprocess
     subprocess.check_call([sys.executable, "-m", "pip", "install", "requests", "beautifulsoup4", "lxml"])
     import requests
-    from bs4 import BeautifulSoup
+    from bs4 import BeautifulSoup, SoupStrainer
+
+import calendar_store
+import event_meta
+import file_store
+import http_client
 
-HEADERS = {
-    "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36",
-    "Accept-Language": "es-PE,es;q=0.9,en;q=0.8",
-}
 BASE = "https://enlima.pe"
 OUTPUT = Path(__file__).resolve().parent / "events_by_day.json"
+# Day pages fetched in parallel from enlima.pe (1 = one page at a time, as before)
+WORKERS = int(os.environ.get("ENLIMA_WORKERS", "6"))
+# Build only the <table> subtrees of day pages (0 = always build the full document)
+FAST_PARSE = os.environ.get("ENLIMA_FAST_PARSE", "1") != "0"
+# Per-day crawl results: {date_key: {"fetched_at": unix time, "events": [...]}}
+STATE_FILE = Path(__file__).resolve().parent / ".cache" / "enlima_days.json"
+# Days from today up to this many days ahead are re-fetched on every run
+HORIZON_DAYS = int(os.environ.get("ENLIMA_HORIZON_DAYS", "14"))
+# Days further out are re-fetched once their stored copy is older than this
+FAR_EVERY_HOURS = float(os.environ.get("ENLIMA_FAR_EVERY_HOURS", "24"))
+
+
+def parse_day_html(html, fast=None):
+    """
+    Soup for a day page. The fast path builds only <table> elements (all that
+    parse_day_page reads); pages without a table fall back to the full document.
+    """
+    fast = FAST_PARSE if fast is None else fast
+    if fast:
+        soup = BeautifulSoup(html, "lxml", parse_only=SoupStrainer("table"))
+        if soup.find("table"):
+            return soup
+    return BeautifulSoup(html, "lxml")
 
 
 def fetch_day(year, month, day):
     url = f"{BASE}/calendario-cultural/dia/{year}-{month:02d}-{day:02d}"
     try:
-        r = requests.get(url, headers=HEADERS, timeout=12)
-        r.raise_for_status()
-        return BeautifulSoup(r.text, "lxml")
+        return parse_day_html(http_client.get_text(url, timeout=12))
+    except http_client.CircuitOpenError:
+        return None
     except Exception as e:
         print(f"  Error {url}: {e}", file=sys.stderr)
         return None
 
 
-def fetch_og_image(url):
-    """Fetch event page and return og:image URL, or ''."""
-    try:
-        r = requests.get(url, headers=HEADERS, timeout=12)
-        r.raise_for_status()
-        text = r.text
-        m = re.search(r'property=["\']og:image["\'][^>]*content=["\']([^"\']+)["\']', text)
-        if m:
-            return m.group(1).strip()
-        m = re.search(r'content=["\']([^"\']+)["\'][^>]*property=["\']og:image["\']', text)
-        if m:
-            return m.group(1).strip()
-    except Exception:
-        pass
-    return ""
-
-
 def parse_day_page(soup, date_key):
     events = []
     if not soup:
@@ -104,6 +126,31 @@ def parse_day_page(soup, date_key):
     return events
 
 
+def fetch_and_parse_day(date_key):
+    """Fetch one day page and parse it (runs inside crawl workers). None if the fetch failed."""
+    year, month, day = (int(x) for x in date_key.split("-"))
+    soup = fetch_day(year, month, day)
+    if soup is None:
+        return None
+    return parse_day_page(soup, date_key)
+
+
+def crawl_days(date_keys, workers=WORKERS):
+    """
+    Yield (date_key, events) for every day, in the order of date_keys
+    (events is None for days whose page could not be fetched).
+    With workers > 1 up to that many day pages are in flight against enlima.pe at
+    once and parsing happens in the workers, overlapping other downloads; results
+    are still handed back in date order so the merge matches a sequential crawl.
+    """
+    if workers <= 1:
+        for date_key in date_keys:
+            yield date_key, fetch_and_parse_day(date_key)
+        return
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        yield from zip(date_keys, pool.map(fetch_and_parse_day, date_keys))
+
+
 MONTH_ES = ("", "Ene", "Feb", "Mar", "Abr", "May", "Jun", "Jul", "Ago", "Sep", "Oct", "Nov", "Dic")
 
 
@@ -125,34 +172,42 @@ def dedupe_repeating_events(events_by_day):
     """
     If the same event (same title+url) appears on multiple days, show it only on
     the first day and add a 'schedule' note (date range).
+
+    One sweep over the days in date order keys every event once and records
+    its first and last date and how often it occurs; a second pass rebuilds
+    each day's list once: its events that occur only once, in order, then a
+    copy of each repeating event that starts that day. Only those copies are
+    new dicts; the input events are left unmodified.
     """
-    # Collect (date_key, event) and group by event_key
-    by_event = {}
+    # key -> [first date, last date, first event, occurrences]
+    seen = {}
+    keys_by_day = {}
     for date_key in sorted(events_by_day.keys()):
+        keys = keys_by_day[date_key] = []
         for ev in events_by_day[date_key]:
             k = event_key(ev)
-            if k not in by_event:
-                by_event[k] = []
-            by_event[k].append((date_key, dict(ev)))
+            keys.append(k)
+            info = seen.get(k)
+            if info is None:
+                seen[k] = [date_key, date_key, ev, 1]
+            else:
+                info[1] = date_key
+                info[3] += 1
 
-    # For each event that appears on 2+ days, keep only first day and set schedule
-    for k, date_ev_list in by_event.items():
-        if len(date_ev_list) < 2:
+    # Repeating events, in order of first appearance, go on their first day
+    starting = {}
+    for first_date, last_date, ev, count in seen.values():
+        if count < 2:
             continue
-        dates = sorted(d[0] for d in date_ev_list)
-        first_date = dates[0]
-        last_date = dates[-1]
-        # Use the event from the first day
-        ev = date_ev_list[0][1]
+        ev = dict(ev)
         ev["schedule"] = f"Del {format_date_short(first_date)} al {format_date_short(last_date)}"
-        # Remove this event from every day
-        for date_key in events_by_day:
-            events_by_day[date_key] = [
-                e for e in events_by_day[date_key]
-                if event_key(e) != k
-            ]
-        # Add it only on the first day
-        events_by_day[first_date].append(ev)
+        starting.setdefault(first_date, []).append(ev)
+
+    if starting:
+        for date_key, events in events_by_day.items():
+            keys = keys_by_day[date_key]
+            kept = [ev for ev, k in zip(events, keys) if seen[k][3] < 2]
+            events_by_day[date_key] = kept + starting.get(date_key, [])
 
     return events_by_day
 
@@ -163,57 +218,163 @@ def is_enlima_event(ev):
     return "enlima.pe" in url
 
 
-def main():
-    # Start from existing calendar if present, so we don't remove Eventbrite/Teleticket events
-    if OUTPUT.exists():
-        with open(OUTPUT, "r", encoding="utf-8") as f:
-            events_by_day = json.load(f)
-    else:
-        events_by_day = {}
-
-    # 2026: Feb (29 days) through Dec (31 days)
-    MONTH_DAYS = [(2, 29), (3, 31), (4, 30), (5, 31), (6, 30), (7, 31), (8, 31), (9, 30), (10, 31), (11, 30), (12, 31)]
-    for month, last_day in MONTH_DAYS:
-        for day in range(1, last_day + 1):
-            date_key = f"2026-{month:02d}-{day:02d}"
-            if date_key not in events_by_day:
-                events_by_day[date_key] = []
-            events_by_day[date_key] = [e for e in events_by_day[date_key] if not is_enlima_event(e)]
-            soup = fetch_day(2026, month, day)
-            new_events = parse_day_page(soup, date_key)
-            events_by_day[date_key].extend(new_events)
-            if new_events:
-                print(f"  {date_key}: {len(new_events)} EnLima events")
+def load_state():
+    try:
+        with open(STATE_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_state(state):
+    """Write the crawl state, keeping days another run fetched more recently."""
+    STATE_FILE.parent.mkdir(parents=True, exist_ok=True)
+    with file_store.locked(STATE_FILE):
+        current = load_state()
+        for date_key, day in state.items():
+            if day.get("fetched_at", 0) >= current.get(date_key, {}).get("fetched_at", 0):
+                current[date_key] = day
+        state.update(current)
+        file_store.atomic_write_json(STATE_FILE, current)
+
+
+def days_to_fetch(date_keys, state, today, horizon_days=HORIZON_DAYS, far_every_hours=FAR_EVERY_HOURS,
+                  targeted=None, full=False, now=None):
+    """
+    Pick the days to re-fetch this run. full: every day; targeted (a set of
+    date keys): exactly those. Otherwise days never fetched, days from today
+    to today + horizon_days, and later days whose copy is older than
+    far_every_hours. Past days are frozen.
+    """
+    if full:
+        return list(date_keys)
+    if targeted is not None:
+        return [k for k in date_keys if k in targeted]
+    now = time.time() if now is None else now
+    today_key = today.isoformat()
+    horizon_key = (today + timedelta(days=horizon_days)).isoformat()
+    due = []
+    for date_key in date_keys:
+        entry = state.get(date_key)
+        if entry is None:
+            due.append(date_key)
+        elif date_key < today_key:
+            continue
+        elif date_key <= horizon_key:
+            due.append(date_key)
+        elif now - entry.get("fetched_at", 0) >= far_every_hours * 3600:
+            due.append(date_key)
+    return due
+
+
+def _targeted_days(args, date_keys):
+    if args.days:
+        return {d.strip() for d in args.days.split(",") if d.strip()}
+    if args.date_from or args.date_to:
+        lo, hi = args.date_from or date_keys[0], args.date_to or date_keys[-1]
+        return {k for k in date_keys if lo <= k <= hi}
+    return None
+
+
+# 2026: Feb (29 days) through Dec (31 days)
+MONTH_DAYS = [(2, 29), (3, 31), (4, 30), (5, 31), (6, 30), (7, 31), (8, 31), (9, 30), (10, 31), (11, 30), (12, 31)]
+DATE_KEYS = [f"2026-{month:02d}-{day:02d}" for month, last_day in MONTH_DAYS for day in range(1, last_day + 1)]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Scrape EnLima day pages into events_by_day.json")
+    parser.add_argument("--workers", type=int, default=WORKERS,
+                        help=f"day pages fetched in parallel (default {WORKERS}, 1 = sequential)")
+    parser.add_argument("--full", action="store_true", help="re-fetch every day, including past ones")
+    parser.add_argument("--days", help="comma-separated YYYY-MM-DD days to re-fetch (nothing else)")
+    parser.add_argument("--from", dest="date_from", help="re-fetch days from this YYYY-MM-DD")
+    parser.add_argument("--to", dest="date_to", help="re-fetch days up to this YYYY-MM-DD")
+    parser.add_argument("--horizon", type=int, default=HORIZON_DAYS,
+                        help=f"days ahead re-fetched every run (default {HORIZON_DAYS})")
+    parser.add_argument("--far-every-hours", type=float, default=FAR_EVERY_HOURS,
+                        help=f"re-fetch days beyond the horizon this often (default {FAR_EVERY_HOURS:g})")
+    return parser.parse_args(argv)
+
+
+def collect(args=None, events_by_day=None):
+    """
+    Crawl the EnLima day pages that are due and fetch og:images.
+    Returns {"days": {date_key: [events]}, "images": {url: image_url}} for merge().
+    events_by_day (read only) seeds the state for days crawled before it existed.
+    """
+    args = args or parse_args([])
+    events_by_day = events_by_day or {}
+
+    # Days crawled before the state file existed start from what the calendar already has
+    state = load_state()
+    for date_key in DATE_KEYS:
+        if date_key not in state and events_by_day.get(date_key):
+            state[date_key] = {"fetched_at": 0,
+                               "events": [e for e in events_by_day[date_key] if is_enlima_event(e)]}
+
+    due = days_to_fetch(DATE_KEYS, state, date.today(), args.horizon, args.far_every_hours,
+                        targeted=_targeted_days(args, DATE_KEYS), full=args.full)
+    print(f"  Fetching {len(due)}/{len(DATE_KEYS)} EnLima day pages")
+    fetched_at = time.time()
+    for date_key, new_events in crawl_days(due, workers=args.workers):
+        if new_events is None:
+            continue  # keep the previous copy of a day we could not fetch
+        state[date_key] = {"fetched_at": fetched_at, "events": new_events}
+        if new_events:
+            print(f"  {date_key}: {len(new_events)} EnLima events")
+    save_state(state)
+    days = {date_key: state.get(date_key, {}).get("events", []) for date_key in DATE_KEYS}
 
     # Fetch og:image from each unique EnLima event page
     unique_urls = []
     seen = set()
-    for date_key in events_by_day:
-        for ev in events_by_day[date_key]:
+    for events in days.values():
+        for ev in events:
             u = ev.get("url") or ""
             if u and "enlima.pe" in u and u not in seen:
                 seen.add(u)
                 unique_urls.append(u)
     url_to_image = {}
-    for i, url in enumerate(unique_urls):
-        if i > 0:
-            time_module.sleep(0.35)
-        img = fetch_og_image(url)
-        if img:
-            url_to_image[url] = img
-        if (i + 1) % 20 == 0 and (i + 1) > 0:
-            print(f"  Fetched images for {i + 1}/{len(unique_urls)} EnLima events...")
+    with ThreadPoolExecutor(max_workers=max(args.workers, 1)) as pool:
+        for i, (url, img) in enumerate(zip(unique_urls, pool.map(event_meta.fetch_og_image, unique_urls))):
+            if img:
+                url_to_image[url] = img
+            if (i + 1) % 20 == 0:
+                print(f"  Fetched images for {i + 1}/{len(unique_urls)} EnLima events...")
+    return {"days": days, "images": url_to_image}
+
+
+def merge(events_by_day, result):
+    """
+    Replace the EnLima partition's crawled days with result's, apply images and
+    dedupe repeating events. Updates events_by_day in place; returns events merged.
+    """
+    added = 0
+    for date_key, events in result["days"].items():
+        events_by_day[date_key] = list(events)
+        added += len(events)
+
+    url_to_image = result["images"]
     for date_key in events_by_day:
         for ev in events_by_day[date_key]:
             if ev.get("url") and ev["url"] in url_to_image:
                 ev["image_url"] = url_to_image[ev["url"]]
 
     print("  Deduplicating repeating events...")
-    events_by_day = dedupe_repeating_events(events_by_day)
+    dedupe_repeating_events(events_by_day)
+    return added
+
+
+def main(argv=None):
+    args = parse_args(argv)
 
-    with open(OUTPUT, "w", encoding="utf-8") as f:
-        json.dump(events_by_day, f, ensure_ascii=False, indent=2)
+    # Only the EnLima partition is replaced; other sources' events are kept
+    result = collect(args, calendar_store.load_partition("enlima"))
+    calendar_store.update_source("enlima", lambda part: merge(part, result))
+    calendar_store.write_view(OUTPUT)
     print(f"Wrote {OUTPUT}")
+    event_meta.print_stats()
+    http_client.print_stats()
 
 
 if __name__ == "__main__":
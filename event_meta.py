@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+Shared per-URL store for metadata scraped from event detail pages.
+
+enlima_calendar, eventbrite_calendar, teleticket_calendar and monitor.py all
+read detail pages for the same few things: og:image, a description, the
+event's start date and its start time. This module extracts all of them from
+one download and keeps them in .cache/event_meta.json with a timestamp per
+field, so a page scraped within EVENT_META_MAX_AGE_HOURS is not fetched again.
+Saving merges into the copy on disk under its lock (file_store), newest field
+wins, so overlapping runs keep each other's lookups. With EVENT_STORE=sqlite
+the entries live in event_store's enrichment table instead (SqliteMetaStore).
+"""
+import atexit
+import json
+import os
+import re
+import sys
+import threading
+import time
+from pathlib import Path
+
+from bs4 import BeautifulSoup
+
+import event_store
+import file_store
+import http_client
+import time_extract
+
+STORE_FILE = Path(__file__).resolve().parent / ".cache" / "event_meta.json"
+MAX_AGE_SECONDS = float(os.environ.get("EVENT_META_MAX_AGE_HOURS", "24")) * 3600
+# Entries whose newest field is older than this are dropped when the store is saved
+PRUNE_AFTER_SECONDS = 30 * 24 * 3600
+
+# image: og:image, description: og:description / meta description,
+# start_date: structured start date (time[datetime], itemprop, event meta, JSON-LD),
+# time: start time found in the page text, text: first 1000 chars of body text
+FIELDS = ("image", "description", "start_date", "time", "text")
+# Fields found in <head>; lookups asking only for these stream the page up to </head>
+HEAD_FIELDS = ("image", "description")
+
+
+# ─── EXTRACTION ──────────────────────────────────────────────────────────────
+
+def og_image_from_html(text):
+    """Extract og:image URL from HTML. Returns '' if not found."""
+    if not text:
+        return ""
+    # property then content, or content then property
+    m = re.search(r'property=["\']og:image["\'][^>]*content=["\']([^"\']+)["\']', text)
+    if m:
+        return m.group(1).strip()
+    m = re.search(r'content=["\']([^"\']+)["\'][^>]*property=["\']og:image["\']', text)
+    if m:
+        return m.group(1).strip()
+    return ""
+
+
+def _start_date_from_soup(soup):
+    # <time datetime="..."> with text content
+    time_el = soup.select_one('time[datetime]')
+    if time_el:
+        value = time_el.get_text(strip=True) or time_el.get("datetime", "")
+        if value:
+            return value
+    # Schema.org itemprop
+    start_el = soup.select_one('[itemprop="startDate"]')
+    if start_el:
+        value = start_el.get("content") or start_el.get("datetime") or start_el.get_text(strip=True)
+        if value:
+            return value
+    # Open Graph event meta
+    start_meta = soup.select_one('meta[property="event:start_time"]') or \
+        soup.select_one('meta[property="event:start_date"]')
+    if start_meta and start_meta.get("content"):
+        return start_meta["content"]
+    # JSON-LD structured data
+    for script in soup.select('script[type="application/ld+json"]'):
+        try:
+            data = json.loads(script.string or "")
+            if isinstance(data, list):
+                data = data[0] if data else {}
+            if data.get("@type") == "Event" and data.get("startDate"):
+                return data["startDate"]
+        except (ValueError, AttributeError, KeyError, IndexError):
+            continue
+    return ""
+
+
+def _description_from_soup(soup):
+    for selector in ('meta[property="og:description"]', 'meta[name="description"]'):
+        el = soup.select_one(selector)
+        if el and el.get("content"):
+            return el["content"].strip()
+    return ""
+
+
+def extract_head_meta(head_html):
+    """Extract HEAD_FIELDS from the <head> of a page (see http_client.get_head)."""
+    return {
+        "image": og_image_from_html(head_html),
+        "description": _description_from_soup(BeautifulSoup(head_html, "lxml")),
+    }
+
+
+def extract_meta(html):
+    """Extract every field in FIELDS from a detail page's HTML."""
+    soup = BeautifulSoup(html, "lxml")
+    body = soup.select_one("body")
+    return {
+        "image": og_image_from_html(html),
+        "description": _description_from_soup(soup),
+        "start_date": _start_date_from_soup(soup).strip(),
+        "time": time_extract.extract_event_time(html),
+        "text": body.get_text(" ", strip=True)[:1000] if body else "",
+    }
+
+
+# ─── STORE ───────────────────────────────────────────────────────────────────
+
+class MetaStore:
+    """{url: {field: {"v": value, "at": unix time}}} persisted as JSON."""
+
+    def __init__(self, path=STORE_FILE, max_age=MAX_AGE_SECONDS):
+        self.path = Path(path)
+        self.max_age = max_age
+        self.hits = 0
+        self.fetches = 0
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._data = self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def get(self, url, fields, max_age=None):
+        """Return {field: value} if every requested field is fresh, else None."""
+        max_age = self.max_age if max_age is None else max_age
+        now = time.time()
+        with self._lock:
+            entry = self._data.get(url) or {}
+            out = {}
+            for field in fields:
+                slot = entry.get(field)
+                if not slot or now - slot.get("at", 0) > max_age:
+                    return None
+                out[field] = slot.get("v", "")
+            self.hits += 1
+            return out
+
+    def put(self, url, values):
+        """Record freshly fetched field values for url."""
+        now = time.time()
+        with self._lock:
+            entry = self._data.setdefault(url, {})
+            for field, value in values.items():
+                entry[field] = {"v": value, "at": now}
+            self.fetches += 1
+            self._dirty = True
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with file_store.locked(self.path):
+                # Another run may have saved since this one loaded: keep the newer value per field
+                merged = self._load()
+                for url, entry in self._data.items():
+                    current = merged.setdefault(url, {})
+                    for field, slot in entry.items():
+                        if slot.get("at", 0) >= current.get(field, {}).get("at", 0):
+                            current[field] = slot
+                cutoff = time.time() - PRUNE_AFTER_SECONDS
+                self._data = {
+                    url: entry for url, entry in merged.items()
+                    if max((slot.get("at", 0) for slot in entry.values()), default=0) >= cutoff
+                }
+                file_store.atomic_write_json(self.path, self._data)
+            self._dirty = False
+
+
+class SqliteMetaStore(MetaStore):
+    """
+    MetaStore over event_store's enrichment table: entries are read per URL on
+    first use and the ones put this run are upserted in one transaction on save.
+    """
+
+    def __init__(self, store, max_age=MAX_AGE_SECONDS):
+        self.store = store
+        self._pending = set()
+        super().__init__(STORE_FILE, max_age)
+        if not store.has_enrichment() and self._data:
+            # First use: import the JSON store
+            store.put_enrichments(self._data)
+        self._data = {}
+
+    def get(self, url, fields, max_age=None):
+        with self._lock:
+            if url not in self._data:
+                self._data[url] = self.store.enrichment(url) or {}
+        return super().get(url, fields, max_age)
+
+    def put(self, url, values):
+        with self._lock:
+            if url not in self._data:
+                self._data[url] = self.store.enrichment(url) or {}
+            self._pending.add(url)
+        super().put(url, values)
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            self.store.put_enrichments({url: self._data[url] for url in self._pending})
+            self.store.prune_enrichment(time.time() - PRUNE_AFTER_SECONDS)
+            self._pending.clear()
+            self._dirty = False
+
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def default_store():
+    """Process-wide store, saved automatically when the script exits."""
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = SqliteMetaStore(event_store.default_store()) if event_store.enabled() else MetaStore()
+            atexit.register(_default.save)
+    return _default
+
+
+def lookup(url, fields=FIELDS, max_age=None, timeout=12):
+    """
+    Return {field: value} for url, from the store when fresh, otherwise by
+    fetching the page once and refreshing every field. When only HEAD_FIELDS
+    are asked for, just the page's <head> is downloaded. Values are '' when the
+    page has no such data; returns None if the page could not be fetched.
+    """
+    store = default_store()
+    cached = store.get(url, fields, max_age)
+    if cached is not None:
+        return cached
+    head_only = all(field in HEAD_FIELDS for field in fields)
+    try:
+        if head_only:
+            values = extract_head_meta(http_client.get_head(url, timeout=timeout))
+        else:
+            values = extract_meta(http_client.get_text(url, timeout=timeout))
+    except http_client.CircuitOpenError:
+        return None
+    except Exception as e:
+        print(f"  Error fetching {url}: {e}", file=sys.stderr)
+        return None
+    store.put(url, values)
+    return {field: values.get(field, "") for field in fields}
+
+
+def fetch_og_image(url):
+    """Return the og:image URL of an event page, or ''."""
+    meta = lookup(url, ("image",))
+    return meta["image"] if meta else ""
+
+
+def print_stats(file=None):
+    store = default_store()
+    if store.hits or store.fetches:
+        print(f"  Detail pages: {store.hits} from metadata store, {store.fetches} fetched",
+              file=file or sys.stdout)
@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+"""
+Optional SQLite event store (stdlib sqlite3, WAL mode), enabled with EVENT_STORE=sqlite.
+
+Instead of loading whole JSON blobs, mutating them and dumping them again, the
+calendar partitions and monitor's database live in one SQLite file
+(EVENT_STORE_PATH, default .cache/events.sqlite3, kept between CI runs by the
+workflows' cache):
+
+  events       one row per event: (kind, source, id) -> JSON data, title,
+               canonical URL, first / last date
+  placements   calendar only: (source, date, position) -> event id
+  enrichment   event_meta's detail-page fields per canonical URL
+  meta         small values such as monitor's last_scan
+
+with indexes on placement date, event source and canonical URL. Writes are
+diffs in one transaction: only events whose data changed are upserted, only
+placements that moved are rewritten, and removed rows are deleted, so a run
+touches only what changed. The JSON files the site and the scripts read are
+exports: calendar_store.write_view() writes the calendar and data/sources/
+from here and monitor.save_db() writes events_db.json after each scan, and
+
+  python3 event_store.py export      # calendar files, data/sources/ and events_db.json
+  python3 event_store.py stats       # row counts
+
+regenerates them on demand. An empty store is seeded from the JSON files on
+first use.
+"""
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from urllib.parse import urlsplit, urlunsplit
+
+PROJECT_DIR = Path(__file__).resolve().parent
+STORE_PATH = Path(os.environ.get("EVENT_STORE_PATH", PROJECT_DIR / ".cache" / "events.sqlite3"))
+CALENDAR = "calendar"
+MONITOR = "monitor"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    kind TEXT NOT NULL,
+    source TEXT NOT NULL,
+    id TEXT NOT NULL,
+    canonical_url TEXT NOT NULL DEFAULT '',
+    title TEXT NOT NULL DEFAULT '',
+    first_date TEXT,
+    last_date TEXT,
+    data TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (kind, source, id)
+);
+CREATE INDEX IF NOT EXISTS events_source ON events (source, kind);
+CREATE INDEX IF NOT EXISTS events_url ON events (canonical_url);
+CREATE TABLE IF NOT EXISTS placements (
+    source TEXT NOT NULL,
+    date TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    event_id TEXT NOT NULL,
+    PRIMARY KEY (source, date, position)
+);
+CREATE INDEX IF NOT EXISTS placements_date ON placements (date);
+CREATE INDEX IF NOT EXISTS placements_event ON placements (source, event_id);
+CREATE TABLE IF NOT EXISTS enrichment (
+    canonical_url TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def canonical_url(url):
+    """URL without query, fragment or trailing slash, with a lower-case host."""
+    parts = urlsplit((url or "").strip())
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path.rstrip("/"), "", ""))
+
+
+def _dumps(obj):
+    return json.dumps(obj, ensure_ascii=False, sort_keys=True)
+
+
+class EventStore:
+    def __init__(self, path=STORE_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Autocommit mode; transactions are opened explicitly with BEGIN IMMEDIATE
+        self.conn = sqlite3.connect(self.path, timeout=60, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self._lock = threading.RLock()
+
+    @contextmanager
+    def transaction(self):
+        """Write transaction; other writers (threads or processes) wait for it."""
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self.conn
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            self.conn.execute("COMMIT")
+
+    def _rows(self, sql, params=()):
+        with self._lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    def close(self):
+        self.conn.close()
+
+    # ─── Calendar ──────────────────────────────────────────────────────────
+
+    def has_calendar(self):
+        return bool(self._rows("SELECT 1 FROM meta WHERE key LIKE 'empty_days:%' LIMIT 1")
+                    or self._rows("SELECT 1 FROM events WHERE kind = ? LIMIT 1", (CALENDAR,)))
+
+    def load_source(self, source):
+        """The source's events_by_day slice; placements of one event share its dict."""
+        events = {eid: json.loads(data) for eid, data in self._rows(
+            "SELECT id, data FROM events WHERE kind = ? AND source = ?", (CALENDAR, source))}
+        days = {}
+        for date_key, eid in self._rows(
+                "SELECT date, event_id FROM placements WHERE source = ? ORDER BY date, position", (source,)):
+            days.setdefault(date_key, []).append(events[eid])
+        row = self._rows("SELECT value FROM meta WHERE key = ?", (f"empty_days:{source}",))
+        for date_key in json.loads(row[0][0]) if row else []:
+            days.setdefault(date_key, [])
+        return {date_key: days[date_key] for date_key in sorted(days)}
+
+    def _replace_source(self, conn, source, events_by_day):
+        """Diff events_by_day against the stored slice and write only the differences."""
+        import calendar_store
+
+        doc = calendar_store.normalize(events_by_day)
+        now = time.time()
+        stored = {eid: (data, first, last) for eid, data, first, last in conn.execute(
+            "SELECT id, data, first_date, last_date FROM events WHERE kind = ? AND source = ?", (CALENDAR, source))}
+        counts = {"upserted": 0, "deleted": 0, "placements": 0}
+        for eid, entry in doc["events"].items():
+            ev = entry["event"]
+            data = _dumps(ev)
+            if stored.get(eid) == (data, entry["first"], entry["last"]):
+                continue
+            conn.execute(
+                "INSERT INTO events (kind, source, id, canonical_url, title, first_date, last_date, data, updated_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT (kind, source, id) DO UPDATE SET canonical_url = excluded.canonical_url,"
+                " title = excluded.title, first_date = excluded.first_date, last_date = excluded.last_date,"
+                " data = excluded.data, updated_at = excluded.updated_at",
+                (CALENDAR, source, eid, canonical_url(ev.get("url")), ev.get("title") or "",
+                 entry["first"], entry["last"], data, now))
+            counts["upserted"] += 1
+        gone = [(CALENDAR, source, eid) for eid in stored if eid not in doc["events"]]
+        conn.executemany("DELETE FROM events WHERE kind = ? AND source = ? AND id = ?", gone)
+        counts["deleted"] = len(gone)
+
+        old = {(d, p): eid for d, p, eid in conn.execute(
+            "SELECT date, position, event_id FROM placements WHERE source = ?", (source,))}
+        new = {(d, p): eid for d, ids in doc["days"].items() for p, eid in enumerate(ids)}
+        conn.executemany("DELETE FROM placements WHERE source = ? AND date = ? AND position = ?",
+                         [(source, d, p) for d, p in old.keys() - new.keys()])
+        changed = [(source, d, p, eid) for (d, p), eid in new.items() if old.get((d, p)) != eid]
+        conn.executemany("INSERT OR REPLACE INTO placements (source, date, position, event_id) VALUES (?, ?, ?, ?)",
+                         changed)
+        counts["placements"] = len(changed) + len(old.keys() - new.keys())
+        # Days listed without events (the calendar keeps them as empty lists)
+        empty = sorted(d for d, ids in doc["days"].items() if not ids)
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                     (f"empty_days:{source}", json.dumps(empty)))
+        return counts
+
+    def replace_source(self, source, events_by_day):
+        with self.transaction() as conn:
+            return self._replace_source(conn, source, events_by_day)
+
+    def update_source(self, source, merge):
+        """merge(slice) applied to the source's current slice inside one write transaction."""
+        with self.transaction() as conn:
+            part = self.load_source(source)
+            result = merge(part)
+            self._replace_source(conn, source, part)
+        return result
+
+    def calendar_view(self, order):
+        """events_by_day of every source, days in date order, sources in `order` within a day."""
+        days = {}
+        for source in order:
+            for date_key, events in self.load_source(source).items():
+                days.setdefault(date_key, []).extend(events)
+        return {date_key: days[date_key] for date_key in sorted(days)}
+
+    def events_on(self, date_key):
+        """(source, event) placed on date_key, using the date index."""
+        return [(source, json.loads(data)) for source, data in self._rows(
+            "SELECT p.source, e.data FROM placements p JOIN events e"
+            " ON e.kind = ? AND e.source = p.source AND e.id = p.event_id"
+            " WHERE p.date = ? ORDER BY p.source, p.position", (CALENDAR, date_key))]
+
+    # ─── Monitor ───────────────────────────────────────────────────────────
+
+    def has_monitor(self):
+        return bool(self._rows("SELECT 1 FROM meta WHERE key = 'monitor_last_scan'")
+                    or self._rows("SELECT 1 FROM events WHERE kind = ? LIMIT 1", (MONITOR,)))
+
+    def load_monitor(self):
+        """monitor's database in its JSON shape: {"events": {id: event}, "last_scan": ...}."""
+        events = {eid: json.loads(data) for eid, data in self._rows(
+            "SELECT id, data FROM events WHERE kind = ? ORDER BY rowid", (MONITOR,))}
+        row = self._rows("SELECT value FROM meta WHERE key = 'monitor_last_scan'")
+        return {"events": events, "last_scan": row[0][0] if row else None}
+
+    def save_monitor(self, db, touched=None):
+        """
+        Upsert monitor events (only `touched` ids when given) and record
+        last_scan, in one transaction.
+        """
+        ids = db["events"].keys() if touched is None else [i for i in touched if i in db["events"]]
+        now = time.time()
+        with self.transaction() as conn:
+            stored = dict(conn.execute("SELECT id, data FROM events WHERE kind = ?", (MONITOR,)))
+            for eid in ids:
+                ev = db["events"][eid]
+                data = _dumps(ev)
+                if stored.get(eid) == data:
+                    continue
+                url = canonical_url(ev.get("url"))
+                conn.execute(
+                    "INSERT INTO events (kind, source, id, canonical_url, title, first_date, last_date, data, updated_at)"
+                    " VALUES (?, ?, ?, ?, ?, NULL, NULL, ?, ?)"
+                    " ON CONFLICT (kind, source, id) DO UPDATE SET canonical_url = excluded.canonical_url,"
+                    " title = excluded.title, data = excluded.data, updated_at = excluded.updated_at",
+                    (MONITOR, ev.get("source") or "", eid, url, ev.get("title") or "", data, now))
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('monitor_last_scan', ?)",
+                         (db.get("last_scan"),))
+
+    def delete_monitor(self, ids):
+        with self.transaction() as conn:
+            conn.executemany("DELETE FROM events WHERE kind = ? AND id = ?", [(MONITOR, i) for i in ids])
+
+    # ─── Enrichment ────────────────────────────────────────────────────────
+
+    def has_enrichment(self):
+        return bool(self._rows("SELECT 1 FROM enrichment LIMIT 1"))
+
+    def put_enrichments(self, entries):
+        """Upsert {url: event_meta entry} in one transaction; updated_at is the entry's newest field."""
+        rows = [(canonical_url(url), _dumps(entry), max((s.get("at", 0) for s in entry.values()), default=0))
+                for url, entry in entries.items()]
+        with self.transaction() as conn:
+            conn.executemany("INSERT OR REPLACE INTO enrichment (canonical_url, data, updated_at) VALUES (?, ?, ?)",
+                             rows)
+
+    def enrichment(self, url):
+        """event_meta's entry ({field: {"v": value, "at": time}}) for url, or None."""
+        row = self._rows("SELECT data FROM enrichment WHERE canonical_url = ?", (canonical_url(url),))
+        return json.loads(row[0][0]) if row else None
+
+    def prune_enrichment(self, before):
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM enrichment WHERE updated_at < ?", (before,))
+
+    def stats(self):
+        out = {}
+        for table in ("events", "placements", "enrichment"):
+            out[table] = self._rows(f"SELECT COUNT(*) FROM {table}")[0][0]
+        return out
+
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def enabled():
+    return os.environ.get("EVENT_STORE", "json").strip().lower() == "sqlite"
+
+
+def default_store():
+    """Process-wide store at STORE_PATH."""
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = EventStore()
+        return _default
+
+
+def export():
+    """Regenerate the JSON artifacts (calendar files, partitions and events_db.json) from the store."""
+    import calendar_store
+    import file_store
+    import monitor
+
+    store = default_store()
+    calendar_store.write_view()
+    if store.has_monitor():
+        # Same layout and write-skip as monitor.save_db
+        file_store.write_json_if_changed(monitor.EVENTS_DB, store.load_monitor(),
+                                         volatile=monitor.VOLATILE_KEYS, indent=2)
+
+
+def main(argv=None):
+    args = sys.argv[1:] if argv is None else argv
+    command = args[0] if args else "stats"
+    if command == "export":
+        export()
+        print(f"  Exported JSON artifacts from {STORE_PATH}")
+    elif command == "stats":
+        for table, count in default_store().stats().items():
+            print(f"  {table}: {count} rows")
+    else:
+        print(f"Unknown command {command!r} (use export or stats)", file=sys.stderr)
+        return 2
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
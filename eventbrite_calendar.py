@@ -4,11 +4,10 @@ Fetch Eventbrite Miraflores events and merge them into events_by_day.json
 so they appear on the calendar alongside EnLima events.
 Run after enlima_calendar.py:  python3 enlima_calendar.py && python3 eventbrite_calendar.py
 """
-import json
 import re
 import sys
-import time as time_module
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
 from pathlib import Path
 
 try:
@@ -20,45 +19,22 @@ except ImportError:
     import requests
     from bs4 import BeautifulSoup
 
-HEADERS = {
-    "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-    "Accept-Language": "es-PE,es;q=0.9,en;q=0.8",
-}
+import calendar_store
+import event_meta
+import eventbrite_listing
+import http_client
+import time_extract
+
 EVENTBRITE_URL = "https://www.eventbrite.com.pe/d/peru--miraflores/events/"
 EVENTS_FILE = Path(__file__).resolve().parent / "events_by_day.json"
+# Event pages fetched in parallel for og:image (paced by rate_limit)
+IMAGE_WORKERS = 4
 
 # Month name to number (English from Eventbrite)
 MONTH_NUM = {"Jan": 1, "Feb": 2, "Mar": 3, "Apr": 4, "May": 5, "Jun": 6,
              "Jul": 7, "Aug": 8, "Sep": 9, "Oct": 10, "Nov": 11, "Dec": 12}
 
 
-def fetch_eventbrite():
-    try:
-        r = requests.get(EVENTBRITE_URL, headers=HEADERS, timeout=15)
-        r.raise_for_status()
-        return BeautifulSoup(r.text, "lxml")
-    except Exception as e:
-        print(f"  Error fetching Eventbrite: {e}", file=sys.stderr)
-        return None
-
-
-def fetch_og_image(url):
-    """Fetch event page and return og:image URL, or ''."""
-    try:
-        r = requests.get(url, headers=HEADERS, timeout=12)
-        r.raise_for_status()
-        text = r.text
-        m = re.search(r'property=["\']og:image["\'][^>]*content=["\']([^"\']+)["\']', text)
-        if m:
-            return m.group(1).strip()
-        m = re.search(r'content=["\']([^"\']+)["\'][^>]*property=["\']og:image["\']', text)
-        if m:
-            return m.group(1).strip()
-    except Exception:
-        pass
-    return ""
-
-
 def parse_date_and_time(date_text, default_year=2026):
     """Parse 'Thu, Feb 26, 7:00 PM' or 'Fri, Mar 6, 7:00 PM' -> (date_key, time_str)."""
     date_text = (date_text or "").strip()
@@ -74,100 +50,80 @@ def parse_date_and_time(date_text, default_year=2026):
             return date_key, time_str.strip()
     # "mañana a las 09:00" -> tomorrow
     if "mañana" in date_text.lower():
-        from datetime import timedelta
         t = datetime.now() + timedelta(days=1)
         return t.strftime("%Y-%m-%d"), re.sub(r".*?(\d{1,2}:\d{2}).*", r"\1", date_text) or ""
     return None, time_str
 
 
+WEEKDAY_DATE_TIME_RE = re.compile(
+    r"(Mon|Tue|Wed|Thu|Fri|Sat|Sun),\s*(Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)\s+(\d{1,2}),\s*(\d{1,2}:\d{2}\s*[AP]M)",
+    re.I)
+WEEKDAY_DATE_RE = re.compile(
+    r"(Mon|Tue|Wed|Thu|Fri|Sat|Sun),\s*(Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)\s+(\d{1,2})", re.I)
+AMPM_RE = re.compile(r"(\d{1,2}:\d{2}\s*[AP]M)", re.I)
+CLOCK_RE = re.compile(r"(\d{1,2}:\d{2})\s*(?:hrs?|h|AM|PM|am|pm)?")
+# A card's start time: the time after its weekday date, else any AM/PM time, else any clock time
+CARD_TIME = time_extract.TimeExtractor([
+    time_extract.strategy("weekday", WEEKDAY_DATE_TIME_RE.pattern, re.I, group=4),
+    time_extract.strategy("ampm", AMPM_RE.pattern, re.I, group=1),
+    time_extract.strategy("clock", CLOCK_RE.pattern, group=1),
+], anchor=r"\d:\d\d")
+LOCATION_RE = re.compile(r"(?:PM|AM)\s+([A-Za-z0-9].*?)(?:\s+Comprobar|\s+Guarda|$)")
+# A card is the nearest ancestor of an event link with more than 50 chars of text
+CARD_BOUNDARY = eventbrite_listing.text_boundary(min_chars=50, max_levels=8)
+
+
+def _card_fields(card):
+    """Date, time, location and fallback title parsed from a card's text (once per card)."""
+    card_text = card.text
+    fields = {"time": CARD_TIME.extract(card_text), "date_key": None}
+    date_match = WEEKDAY_DATE_RE.search(card_text)
+    month = MONTH_NUM.get(date_match.group(2)[:3].title()) if date_match else None
+    if month:
+        fields["date_key"] = f"2026-{month:02d}-{int(date_match.group(3)):02d}"
+        before = card_text[:date_match.start()].strip()
+        before = re.sub(r"^.*?(La venta se termina pronto|Comprobar|Guarda).*?", "", before, flags=re.I).strip()
+        before = re.sub(r"\s+", " ", before).strip()
+        fields["title"] = before[-80:] if len(before) > 10 else before or "Event"
+        loc_match = LOCATION_RE.search(card_text)
+        location = (loc_match.group(1).strip() if loc_match else "Miraflores").replace("Lime", "Lima")
+        fields["venue"] = location if len(location) <= 80 else "Miraflores"
+    elif "mañana" in card_text.lower():
+        fields["tomorrow"] = (datetime.now() + timedelta(days=1)).strftime("%Y-%m-%d")
+        tm = re.search(r"(\d{1,2}:\d{2})", card_text)
+        fields["tomorrow_time"] = tm.group(1) if tm else ""
+    return fields
+
+
 def scrape_eventbrite_events(soup):
     events_with_dates = []
-    seen_urls = set()
     if not soup:
         return events_with_dates
-    for link in soup.select('a[href*="/e/"]'):
+    for url, link, card in eventbrite_listing.CardIndex(soup, CARD_BOUNDARY):
         try:
-            url = link.get("href", "")
-            if not url or url in seen_urls:
-                continue
-            if not url.startswith("http"):
-                url = "https://www.eventbrite.com.pe" + url
-            seen_urls.add(url)
-            card_text = ""
-            parent = link.parent
-            for _ in range(8):
-                if not parent:
-                    break
-                card_text = parent.get_text(separator=" ", strip=True)
-                if len(card_text) > 50:
-                    break
-                parent = getattr(parent, "parent", None)
-            if not card_text:
+            if not card.text:
                 continue
-            date_match = re.search(
-                r"(Mon|Tue|Wed|Thu|Fri|Sat|Sun),\s*(Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)\s+(\d{1,2}),\s*(\d{1,2}:\d{2}\s*[AP]M)",
-                card_text, re.I
-            )
-            time_str = ""
-            if date_match:
-                time_str = date_match.group(4).strip() if date_match.lastindex >= 4 else ""
-            if not time_str:
-                tm = re.search(r"(\d{1,2}:\d{2}\s*[AP]M)", card_text, re.I)
-                if tm:
-                    time_str = tm.group(1).strip()
-            if not time_str:
-                tm = re.search(r"(\d{1,2}:\d{2})\s*(?:hrs?|h|AM|PM|am|pm)?", card_text)
-                if tm:
-                    time_str = tm.group(1).strip()
-            date_match = re.search(
-                r"(Mon|Tue|Wed|Thu|Fri|Sat|Sun),\s*(Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)\s+(\d{1,2})",
-                card_text, re.I
-            )
-            if date_match:
-                _, month_str, day_str = date_match.groups()
-                month = MONTH_NUM.get(month_str[:3].title())
-                if month:
-                    day = int(day_str)
-                    date_key = f"2026-{month:02d}-{day:02d}"
-                    title = link.get_text(strip=True)
-                    if not title:
-                        before = card_text[:date_match.start()].strip()
-                        before = re.sub(r"^.*?(La venta se termina pronto|Comprobar|Guarda).*?", "", before, flags=re.I).strip()
-                        before = re.sub(r"\s+", " ", before).strip()
-                        title = before[-80:] if len(before) > 10 else before or "Event"
-                    if len(title) < 3:
-                        continue
-                    if title.startswith("La venta "):
-                        continue
-                    loc_match = re.search(r"(?:PM|AM)\s+([A-Za-z0-9].*?)(?:\s+Comprobar|\s+Guarda|$)", card_text)
-                    location = (loc_match.group(1).strip() if loc_match else "Miraflores").replace("Lime", "Lima")
-                    if len(location) > 80:
-                        location = "Miraflores"
-                    ev = {
-                        "time": time_str.strip() if time_str else "",
-                        "type": "Eventbrite",
-                        "title": title[:120],
-                        "url": url,
-                        "venue": location,
-                        "district": "Miraflores",
-                        "price": "",
-                        "source": "Eventbrite",
-                    }
-                    events_with_dates.append((date_key, ev))
+            fields = card.fields(_card_fields)
+            if fields["date_key"]:
+                title = link.get_text(strip=True) or fields["title"]
+                if len(title) < 3 or title.startswith("La venta "):
                     continue
-            if "mañana" in card_text.lower():
-                from datetime import timedelta
-                t = datetime.now() + timedelta(days=1)
-                date_key = t.strftime("%Y-%m-%d")
-                time_str = ""
-                tm = re.search(r"(\d{1,2}:\d{2})", card_text)
-                if tm:
-                    time_str = tm.group(1)
-                title = link.get_text(strip=True) or card_text[:60].strip()
+                events_with_dates.append((fields["date_key"], {
+                    "time": fields["time"],
+                    "type": "Eventbrite",
+                    "title": title[:120],
+                    "url": url,
+                    "venue": fields["venue"],
+                    "district": "Miraflores",
+                    "price": "",
+                    "source": "Eventbrite",
+                }))
+            elif "tomorrow" in fields:
+                title = link.get_text(strip=True) or card.text[:60].strip()
                 if len(title) < 2:
                     continue
-                ev = {
-                    "time": time_str,
+                events_with_dates.append((fields["tomorrow"], {
+                    "time": fields["tomorrow_time"],
                     "type": "Eventbrite",
                     "title": title[:120],
                     "url": url,
@@ -175,45 +131,73 @@ def scrape_eventbrite_events(soup):
                     "district": "Miraflores",
                     "price": "",
                     "source": "Eventbrite",
-                }
-                events_with_dates.append((date_key, ev))
+                }))
         except Exception:
             continue
     return events_with_dates
 
 
-def main():
+def events_from_listing(listing_events):
+    """(date_key, event) pairs from the events in a listing's embedded JSON."""
+    events_with_dates = []
+    for item in listing_events:
+        if not item["start_date"] or len(item["title"]) < 3:
+            continue
+        ev = {
+            "time": time_extract.normalize_time(item["start_time"]).upper() if item["start_time"] else "",
+            "type": "Eventbrite",
+            "title": item["title"][:120],
+            "url": item["url"],
+            "venue": item["venue"][:80] or "Miraflores",
+            "district": "Miraflores",
+            "price": "" if item["is_free"] else item["price"],
+            "source": "Eventbrite",
+        }
+        if item["image"]:
+            ev["image_url"] = item["image"]
+        events_with_dates.append((item["start_date"], ev))
+    return events_with_dates
+
+
+def collect():
+    """
+    Fetch the Eventbrite listing and og:images; returns [(date_key, event)] for
+    merge(), or None if the listing page could not be fetched.
+    """
     print("  Fetching Eventbrite (Miraflores)...")
-    soup = fetch_eventbrite()
-    events_with_dates = scrape_eventbrite_events(soup)
+    listing = eventbrite_listing.fetch_listing(EVENTBRITE_URL)
+    if listing.html is None:
+        print("  Eventbrite listing could not be fetched; keeping the previous events")
+        return None
+    if listing.events is not None:
+        events_with_dates = events_from_listing(eventbrite_listing.dedupe_events(listing.events))
+    else:
+        # No embedded payload: fall back to the rendered cards of page 1
+        soup = BeautifulSoup(listing.html, "lxml")
+        events_with_dates = scrape_eventbrite_events(soup)
     print(f"  Found {len(events_with_dates)} Eventbrite events with dates")
 
-    # Fetch og:image from each unique event page
-    unique_urls = list({ev.get("url") for _, ev in events_with_dates if ev.get("url")})
+    # Fetch og:image from each unique event page the listing had no image for
+    unique_urls = list({ev.get("url") for _, ev in events_with_dates
+                        if ev.get("url") and not ev.get("image_url")})
     url_to_image = {}
-    for i, url in enumerate(unique_urls):
-        if i > 0:
-            time_module.sleep(0.35)
-        img = fetch_og_image(url)
-        if img:
-            url_to_image[url] = img
-        if (i + 1) % 10 == 0 and (i + 1) > 0:
-            print(f"    Fetched images for {i + 1}/{len(unique_urls)} Eventbrite events...")
+    with ThreadPoolExecutor(max_workers=IMAGE_WORKERS) as pool:
+        for i, (url, img) in enumerate(zip(unique_urls, pool.map(event_meta.fetch_og_image, unique_urls))):
+            if img:
+                url_to_image[url] = img
+            if (i + 1) % 10 == 0:
+                print(f"    Fetched images for {i + 1}/{len(unique_urls)} Eventbrite events...")
     for _, ev in events_with_dates:
         if ev.get("url") and ev["url"] in url_to_image:
             ev["image_url"] = url_to_image[ev["url"]]
+    return events_with_dates
 
-    if not Path(EVENTS_FILE).exists():
-        print(f"  {EVENTS_FILE} not found. Run enlima_calendar.py first.")
-        return
-
-    with open(EVENTS_FILE, "r", encoding="utf-8") as f:
-        events_by_day = json.load(f)
 
-    # Remove existing Eventbrite events so we don't duplicate when re-running
-    for date_key in list(events_by_day.keys()):
-        if date_key.startswith("2026-"):
-            events_by_day[date_key] = [e for e in events_by_day[date_key] if "eventbrite" not in (e.get("url") or "")]
+def merge(events_by_day, events_with_dates):
+    """Replace the 2026 days of the Eventbrite partition with these, in place; returns events merged."""
+    # Drop the previous run's events so we don't duplicate when re-running
+    for date_key in [d for d in events_by_day if d.startswith("2026-")]:
+        del events_by_day[date_key]
     added = 0
     for date_key, ev in events_with_dates:
         if not date_key.startswith("2026-"):
@@ -222,10 +206,18 @@ def main():
             events_by_day[date_key] = []
         events_by_day[date_key].append(ev)
         added += 1
+    return added
 
-    with open(EVENTS_FILE, "w", encoding="utf-8") as f:
-        json.dump(events_by_day, f, ensure_ascii=False, indent=2)
+
+def main():
+    events_with_dates = collect()
+    if events_with_dates is None:
+        return
+    added = calendar_store.update_source("eventbrite", lambda part: merge(part, events_with_dates))
+    calendar_store.write_view(EVENTS_FILE)
     print(f"  Merged {added} Eventbrite events into calendar. Wrote {EVENTS_FILE}")
+    event_meta.print_stats()
+    http_client.print_stats()
 
 
 if __name__ == "__main__":
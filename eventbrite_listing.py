@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+"""
+Eventbrite listing pages: structured event payloads, and card indexing as the fallback.
+
+Listing pages embed the events they render as JSON, either in
+window.__SERVER_DATA__ (search_data.events.results, with pagination) or in a
+JSON-LD ItemList. parse_listing() reads that payload in one parse into plain
+event dicts (url, title, start_date, start_time, venue, image, summary,
+is_free, price). fetch_listing() reads page 1, then fetches the remaining pages
+concurrently, and dedupe_events() merges several listings (e.g. "free" and
+"all") by event URL before anything fetches detail pages.
+
+When a page carries no payload, scrapers fall back to the rendered cards.
+A listing renders each event as a card containing several <a href="/e/...">
+links (image, title, "save"), so walking up from every link and calling
+get_text() on each ancestor re-serializes the same subtrees again and again.
+CardIndex walks the links once, finds each link's card container with a
+boundary rule, and memoizes every node's text, so each card's text is
+extracted once however many links point into it. Per-card fields parsed by a
+scraper are memoized the same way (Card.fields).
+
+Used by eventbrite_calendar and monitor.scrape_eventbrite.
+"""
+import json
+import os
+import re
+import sys
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit, urlunsplit
+
+import http_client
+
+EVENT_LINKS = 'a[href*="/e/"]'
+BASE_URL = "https://www.eventbrite.com.pe"
+# Listing pages read per listing URL, and how many are fetched at once
+MAX_PAGES = int(os.environ.get("EVENTBRITE_MAX_PAGES", "5"))
+PAGE_WORKERS = 3
+
+# One event link on the page: absolute url, the <a> tag, and its Card
+CardLink = namedtuple("CardLink", "url link card")
+
+
+class Card:
+    """A card container node with its text, computed once."""
+
+    __slots__ = ("node", "text", "_fields")
+
+    def __init__(self, node, text):
+        self.node = node
+        self.text = text
+        self._fields = None
+
+    def fields(self, parse):
+        """parse(card) -> value, called at most once per card."""
+        if self._fields is None:
+            self._fields = parse(self)
+        return self._fields
+
+
+def absolute_url(href):
+    return href if href.startswith("http") else BASE_URL + href
+
+
+class CardIndex:
+    """
+    Index of the event links on a listing page and the cards they belong to.
+
+    boundary(index, link) -> container node (or None) decides where a card
+    ends; text_boundary and class_boundary below are the two rules the
+    scrapers use. key(url) -> dedupe key; links whose key was already seen
+    are skipped, as Eventbrite renders several links per event.
+    """
+
+    def __init__(self, soup, boundary, key=None, selector=EVENT_LINKS):
+        self._text = {}
+        self._cards = {}
+        self.links = []
+        if soup is None:
+            return
+        seen = set()
+        for link in soup.select(selector):
+            href = link.get("href", "")
+            if not href:
+                continue
+            url = absolute_url(href)
+            k = key(url) if key else url
+            if k in seen:
+                continue
+            seen.add(k)
+            node = boundary(self, link)
+            self.links.append(CardLink(url, link, self._card(node)))
+
+    def text(self, node):
+        """node.get_text(" ", strip=True), computed once per node."""
+        if node is None:
+            return ""
+        key = id(node)
+        text = self._text.get(key)
+        if text is None:
+            text = self._text[key] = node.get_text(separator=" ", strip=True)
+        return text
+
+    def _card(self, node):
+        if node is None:
+            return Card(None, "")
+        card = self._cards.get(id(node))
+        if card is None:
+            card = self._cards[id(node)] = Card(node, self.text(node))
+        return card
+
+    def __iter__(self):
+        return iter(self.links)
+
+    def __len__(self):
+        return len(self.links)
+
+    @property
+    def cards(self):
+        """Distinct cards in page order."""
+        return list(self._cards.values())
+
+
+def text_boundary(min_chars=50, max_levels=8):
+    """First ancestor (up to max_levels) whose text exceeds min_chars, else the last one tried."""
+
+    def boundary(index, link):
+        node = None
+        parent = link.parent
+        for _ in range(max_levels):
+            if not parent:
+                break
+            node = parent
+            if len(index.text(parent)) > min_chars:
+                break
+            parent = getattr(parent, "parent", None)
+        return node
+
+    return boundary
+
+
+def _is_container(node, markers):
+    classes = node.get("class") or []
+    return any(m in c for c in classes for m in markers)
+
+
+def class_boundary(markers=("Container", "NestedAction", "Stack"), max_levels=5):
+    """Walk up (not into <body>) until a node whose class names contain one of markers."""
+
+    def boundary(index, link):
+        card = link
+        for _ in range(max_levels):
+            if card.parent and card.parent.name != "body":
+                card = card.parent
+            if _is_container(card, markers):
+                break
+        return card
+
+    return boundary
+
+
+# ─── Structured payload ──────────────────────────────────────────────────────
+
+_SERVER_DATA_RE = re.compile(r"window\.__SERVER_DATA__\s*=\s*")
+_JSON_LD_RE = re.compile(r'<script[^>]+type=["\']application/ld\+json["\'][^>]*>(.*?)</script>', re.I | re.S)
+
+# One listing URL's result: events from the payload (None when no page had
+# one) and page 1's HTML for the card fallback
+Listing = namedtuple("Listing", "url events html")
+
+
+def base_url(url):
+    """Event URL without query string or fragment, used as its identity."""
+    parts = urlsplit(url or "")
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, "", ""))
+
+
+def _event(url, title, start_date="", start_time="", venue="", image="", summary="", is_free=False, price=""):
+    return {
+        "url": url,
+        "title": (title or "").strip(),
+        "start_date": start_date or "",
+        "start_time": start_time or "",
+        "venue": (venue or "").strip(),
+        "image": image or "",
+        "summary": (summary or "").strip(),
+        "is_free": bool(is_free),
+        "price": price or "",
+    }
+
+
+def _from_server_result(r):
+    venue = r.get("primary_venue") or {}
+    tickets = r.get("ticket_availability") or {}
+    price = (tickets.get("minimum_ticket_price") or {}).get("display", "")
+    return _event(
+        url=r.get("url") or "",
+        title=r.get("name"),
+        start_date=r.get("start_date"),
+        start_time=r.get("start_time"),
+        venue=venue.get("name") or (venue.get("address") or {}).get("city", ""),
+        image=(r.get("image") or {}).get("url", ""),
+        summary=r.get("summary"),
+        is_free=r.get("is_free") or tickets.get("is_free"),
+        price=price,
+    )
+
+
+def _server_data(html):
+    m = _SERVER_DATA_RE.search(html)
+    if not m:
+        return None
+    try:
+        data, _ = json.JSONDecoder().raw_decode(html, m.end())
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def _from_json_ld_event(item):
+    start = item.get("startDate") or ""
+    location = item.get("location") or {}
+    if isinstance(location, list):
+        location = location[0] if location else {}
+    image = item.get("image") or ""
+    if isinstance(image, list):
+        image = image[0] if image else ""
+    offers = item.get("offers") or {}
+    if isinstance(offers, list):
+        offers = offers[0] if offers else {}
+    low = offers.get("lowPrice", offers.get("price"))
+    return _event(
+        url=item.get("url") or "",
+        title=item.get("name"),
+        start_date=start[:10],
+        start_time=start[11:16],
+        venue=location.get("name", "") if isinstance(location, dict) else "",
+        image=image if isinstance(image, str) else image.get("url", ""),
+        summary=item.get("description"),
+        is_free=low is not None and str(low) in ("0", "0.0", "0.00"),
+    )
+
+
+def _json_ld_events(html):
+    events = []
+    for block in _JSON_LD_RE.findall(html):
+        try:
+            data = json.loads(block)
+        except ValueError:
+            continue
+        stack = data if isinstance(data, list) else [data]
+        for node in stack:
+            if not isinstance(node, dict):
+                continue
+            kind = node.get("@type")
+            if kind == "ItemList":
+                for element in node.get("itemListElement") or []:
+                    item = element.get("item", element) if isinstance(element, dict) else None
+                    if isinstance(item, dict) and item.get("url"):
+                        events.append(_from_json_ld_event(item))
+            elif isinstance(kind, str) and kind.endswith("Event") and node.get("url"):
+                events.append(_from_json_ld_event(node))
+    return events
+
+
+def parse_listing(html):
+    """
+    (events, page_count) from a listing page's embedded payload. events is None
+    when the page has no payload; page_count is None when it is not stated.
+    """
+    if not html:
+        return None, None
+    data = _server_data(html)
+    found = ((data or {}).get("search_data") or {}).get("events") or {}
+    if isinstance(found.get("results"), list):
+        page_count = (found.get("pagination") or {}).get("page_count")
+        events = [_from_server_result(r) for r in found["results"] if isinstance(r, dict) and r.get("url")]
+        return events, page_count if isinstance(page_count, int) else None
+    events = _json_ld_events(html)
+    return (events, None) if events else (None, None)
+
+
+def page_url(url, page):
+    if page == 1:
+        return url
+    return f"{url}{'&' if '?' in url else '?'}page={page}"
+
+
+def _fetch_html(url):
+    try:
+        return http_client.get_text(url, timeout=15)
+    except http_client.CircuitOpenError:
+        return None
+    except Exception as e:
+        print(f"  Error fetching {url}: {e}", file=sys.stderr)
+        return None
+
+
+def fetch_listing(url, max_pages=MAX_PAGES, workers=PAGE_WORKERS):
+    """
+    Read the payload of a listing and of its following pages. With a stated
+    page count, pages 2..N are fetched concurrently in one batch; without it
+    they are fetched `workers` at a time until a page adds no new events.
+    """
+    html = _fetch_html(url)
+    events, page_count = parse_listing(html)
+    if events is None:
+        return Listing(url, None, html)
+    seen = {base_url(e["url"]) for e in events}
+
+    def add(page_html):
+        new = 0
+        for ev in parse_listing(page_html)[0] or []:
+            key = base_url(ev["url"])
+            if key not in seen:
+                seen.add(key)
+                events.append(ev)
+                new += 1
+        return new
+
+    last = min(page_count or max_pages, max_pages)
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as pool:
+        page = 2
+        while page <= last:
+            batch = range(page, last + 1) if page_count else range(page, min(page + workers, last + 1))
+            added = [add(h) for h in pool.map(_fetch_html, [page_url(url, p) for p in batch])]
+            if not page_count and (not added or not added[-1]):
+                break
+            page = batch[-1] + 1
+    return Listing(url, events, html)
+
+
+def fetch_listings(urls, max_pages=MAX_PAGES):
+    """fetch_listing() for several listing URLs at once, in the given order."""
+    with ThreadPoolExecutor(max_workers=max(len(urls), 1)) as pool:
+        return list(pool.map(lambda u: fetch_listing(u, max_pages), urls))
+
+
+def dedupe_events(events):
+    """
+    Events with the same base URL collapsed onto the first one, in order; an
+    event is free if any listing marked it free.
+    """
+    out = {}
+    for ev in events:
+        key = base_url(ev["url"])
+        kept = out.get(key)
+        if kept is None:
+            out[key] = ev
+        elif ev.get("is_free") and not kept.get("is_free"):
+            kept["is_free"] = True
+    return list(out.values())
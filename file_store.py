@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Crash- and overlap-safe JSON files for the scrapers and the monitor.
+
+atomic_write() writes a temp file in the same directory, fsyncs it and
+os.replace()s it over the target, so readers (and a run killed mid-write) see
+either the old file or the new one, never a truncated one. locked() holds an
+exclusive advisory lock (fcntl.flock on "<file>.lock") around a
+read-modify-write, so two runs updating the same file take turns. stamp()
+identifies the version of a file that was read: if it differs when a run is
+about to write, another run replaced the file in the meantime and the caller
+re-reads it and merges its own changes into that copy instead of clobbering it.
+
+write_json_if_changed() writes canonical JSON (sorted keys, fixed separators)
+and skips the write when the file already holds the same content, ignoring
+`volatile` keys such as timestamps, so a run that found nothing new leaves the
+file, and the workflow's commit, alone.
+"""
+import hashlib
+import json
+import os
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # not on Windows: locking becomes a no-op
+    fcntl = None
+
+
+def stamp(path):
+    """(inode, size, mtime_ns) of path, or None if it does not exist."""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+def atomic_write(path, data):
+    """Replace path with data (bytes or str) atomically."""
+    path = Path(path)
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        # mkstemp creates 0600 files; keep the usual permissions for committed data
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def atomic_write_json(path, obj, **dump_kwargs):
+    dump_kwargs.setdefault("ensure_ascii", False)
+    atomic_write(path, json.dumps(obj, **dump_kwargs))
+
+
+def canonical_json(obj, **dump_kwargs):
+    """obj as canonical JSON bytes: sorted keys, UTF-8, same bytes for the same content."""
+    dump_kwargs.setdefault("ensure_ascii", False)
+    dump_kwargs.setdefault("sort_keys", True)
+    return json.dumps(obj, **dump_kwargs).encode("utf-8")
+
+
+def _without(obj, keys):
+    if isinstance(obj, dict):
+        return {k: _without(v, keys) for k, v in obj.items() if k not in keys}
+    if isinstance(obj, list):
+        return [_without(v, keys) for v in obj]
+    return obj
+
+
+def content_hash(obj, volatile=()):
+    """sha256 of obj's canonical form, leaving out `volatile` keys at any depth."""
+    if volatile:
+        obj = _without(obj, set(volatile))
+    return hashlib.sha256(canonical_json(obj, separators=(",", ":"))).hexdigest()
+
+
+def write_json_if_changed(path, obj, volatile=(), **dump_kwargs):
+    """
+    Write obj as canonical JSON unless path already holds the same content
+    (apart from `volatile` keys). Returns True if the file was written.
+    """
+    data = canonical_json(obj, **dump_kwargs)
+    try:
+        with open(path, "rb") as f:
+            current = f.read()
+    except FileNotFoundError:
+        current = None
+    if current == data:
+        return False
+    if current is not None and volatile:
+        try:
+            if content_hash(json.loads(current), volatile) == content_hash(obj, volatile):
+                return False
+        except ValueError:
+            pass
+    atomic_write(path, data)
+    return True
+
+
+@contextmanager
+def locked(path):
+    """Exclusive advisory lock for read-modify-write of path (blocks until free)."""
+    if fcntl is None:
+        yield
+        return
+    lock_path = Path(f"{path}.lock")
+    with open(lock_path, "a") as lock:
+        fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Persistent on-disk HTTP response cache with conditional revalidation.
+
+Bodies are stored zlib-compressed under .cache/http/, keyed by URL, together
+with their ETag / Last-Modified validators. The next run sends
+If-None-Match / If-Modified-Since and a 304 reuses the stored body, so pages
+that did not change since the last hourly run are not downloaded again.
+Entries expire after HTTP_CACHE_TTL_HOURS and the least recently used ones
+are evicted once the cache exceeds HTTP_CACHE_MAX_MB; body files no index
+entry refers to (left by a crash or an older version) are removed on save.
+Saving merges the index into the copy on disk under its lock (file_store), so
+overlapping runs keep each other's entries.
+"""
+import atexit
+import hashlib
+import json
+import os
+import threading
+import time
+import zlib
+from pathlib import Path
+
+import file_store
+
+CACHE_DIR = Path(__file__).resolve().parent / ".cache" / "http"
+TTL_SECONDS = float(os.environ.get("HTTP_CACHE_TTL_HOURS", "168")) * 3600
+MAX_BYTES = int(float(os.environ.get("HTTP_CACHE_MAX_MB", "64")) * 1024 * 1024)
+# Unindexed files younger than this may belong to a run that has not saved yet
+ORPHAN_GRACE_SECONDS = 24 * 3600
+
+
+class HttpCache:
+    def __init__(self, directory=CACHE_DIR, ttl=TTL_SECONDS, max_bytes=MAX_BYTES):
+        self.directory = Path(directory)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0      # 304s answered from the cache
+        self.stored = 0    # full bodies written
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._index = self._load_index()
+        # URLs this run expired or evicted, so a save does not bring them back from disk
+        self._removed = set()
+
+    @property
+    def _index_file(self):
+        return self.directory / "index.json"
+
+    def _load_index(self):
+        try:
+            with open(self._index_file, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _body_file(self, url):
+        return self.directory / (hashlib.sha1(url.encode("utf-8")).hexdigest() + ".z")
+
+    def _unlink(self, url):
+        self._removed.add(url)
+        try:
+            self._body_file(url).unlink()
+        except OSError:
+            pass
+
+    def _sweep(self):
+        """Remove body and temp files that no index entry refers to."""
+        keep = {self._body_file(url).name for url in self._index}
+        cutoff = time.time() - ORPHAN_GRACE_SECONDS
+        for path in [*self.directory.glob("*.z"), *self.directory.glob("*.tmp")]:
+            if path.name in keep:
+                continue
+            try:
+                if path.stat().st_mtime < cutoff:
+                    path.unlink()
+            except OSError:
+                pass
+
+    def lookup(self, url):
+        """Return the cache entry for url, or None if missing or older than the TTL."""
+        with self._lock:
+            entry = self._index.get(url)
+            if entry and time.time() - entry.get("checked_at", 0) > self.ttl:
+                self._index.pop(url, None)
+                self._dirty = True
+                entry = None
+                self._unlink(url)
+        if entry and not self._body_file(url).exists():
+            return None
+        return entry
+
+    @staticmethod
+    def conditional_headers(entry):
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def body(self, url):
+        """
+        Return the stored body of url (after a 304) and mark the entry as used;
+        None if the body is gone (evicted by another run since lookup) or unreadable.
+        """
+        try:
+            data = zlib.decompress(self._body_file(url).read_bytes()).decode("utf-8")
+        except (OSError, zlib.error, UnicodeDecodeError):
+            with self._lock:
+                self._index.pop(url, None)
+                self._unlink(url)
+                self._dirty = True
+            return None
+        now = time.time()
+        with self._lock:
+            entry = self._index.get(url)
+            if entry:
+                entry["checked_at"] = entry["used_at"] = now
+            self.hits += 1
+            self._dirty = True
+        return data
+
+    def store(self, url, response, text):
+        """Store text for url if the response carries a validator to revalidate with."""
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if not etag and not last_modified:
+            return
+        data = zlib.compress(text.encode("utf-8"), 6)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        file_store.atomic_write(self._body_file(url), data)
+        now = time.time()
+        with self._lock:
+            self._removed.discard(url)
+            self._index[url] = {
+                "etag": etag or "",
+                "last_modified": last_modified or "",
+                "checked_at": now,
+                "used_at": now,
+                "size": len(data),
+            }
+            self.stored += 1
+            self._dirty = True
+
+    def save(self):
+        """Merge with the index on disk, evict least recently used entries down to max_bytes and write it."""
+        with self._lock:
+            if not self._dirty:
+                return
+            self.directory.mkdir(parents=True, exist_ok=True)
+            with file_store.locked(self._index_file):
+                self._merge_saved()
+                self._evict()
+                self._sweep()
+                file_store.atomic_write_json(self._index_file, self._index)
+            self._dirty = False
+
+    @staticmethod
+    def _touched_at(entry):
+        return max(entry.get("checked_at", 0), entry.get("used_at", 0))
+
+    def _merge_saved(self):
+        """Add entries another run saved since this one loaded (the more recently used copy wins)."""
+        for url, entry in self._load_index().items():
+            if url in self._removed:
+                continue
+            mine = self._index.get(url)
+            if mine is None or self._touched_at(entry) > self._touched_at(mine):
+                self._index[url] = entry
+
+    def _evict(self):
+        total = sum(e.get("size", 0) for e in self._index.values())
+        for url, entry in sorted(self._index.items(), key=lambda kv: kv[1].get("used_at", 0)):
+            if total <= self.max_bytes:
+                break
+            total -= entry.get("size", 0)
+            del self._index[url]
+            self._unlink(url)
+
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def default_cache():
+    """Process-wide cache, saved automatically when the script exits."""
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = HttpCache()
+            atexit.register(_default.save)
+    return _default
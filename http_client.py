@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Shared HTTP client for the calendar scrapers and monitor.py.
+
+Every fetch goes through one keep-alive requests.Session per host, so the
+hundreds of requests a run makes to enlima.pe / teleticket / eventbrite reuse
+pooled TCP+TLS connections instead of handshaking each time. Headers and
+timeouts live here too, and connection_stats() reports how many connections
+were opened vs reused per host. get_text() additionally revalidates against
+the on-disk cache in http_cache.py; pacing, retries and circuit breaking come
+from rate_limit.py and fetch_policy.py.
+"""
+import codecs
+import sys
+import threading
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+import fetch_policy
+import http_cache
+import rate_limit
+from fetch_policy import CircuitOpenError  # noqa: F401  (re-exported for callers)
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
+                  "AppleWebKit/537.36 (KHTML, like Gecko) "
+                  "Chrome/120.0.0.0 Safari/537.36",
+    "Accept-Language": "es-PE,es;q=0.9,en;q=0.8",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+}
+DEFAULT_TIMEOUT = 12
+# get_head() gives up on pages whose <head> is larger than this
+HEAD_MAX_BYTES = 256 * 1024
+# Keep-alive connections per host; callers block for a free one instead of opening more
+POOL_SIZE = 10
+
+_sessions = {}
+_lock = threading.Lock()
+_requests = Counter()
+_opened = Counter()
+
+
+def host_of(url):
+    return urlsplit(url).netloc.lower()
+
+
+class _CountingHTTPConnection(HTTPConnection):
+    def connect(self):
+        with _lock:
+            _opened[self.host.lower()] += 1
+        super().connect()
+
+
+class _CountingHTTPSConnection(HTTPSConnection):
+    def connect(self):
+        with _lock:
+            _opened[self.host.lower()] += 1
+        super().connect()
+
+
+class _CountingHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _CountingHTTPConnection
+
+
+class _CountingHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _CountingHTTPSConnection
+
+
+class PooledAdapter(HTTPAdapter):
+    """HTTPAdapter whose connections count every real TCP connect per host."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _CountingHTTPConnectionPool,
+            "https": _CountingHTTPSConnectionPool,
+        }
+
+
+def session_for(url):
+    """Return the pooled Session for url's host, creating it on first use."""
+    host = host_of(url)
+    with _lock:
+        session = _sessions.get(host)
+        if session is None:
+            session = requests.Session()
+            session.headers.update(HEADERS)
+            adapter = PooledAdapter(pool_connections=2, pool_maxsize=POOL_SIZE, pool_block=True)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _sessions[host] = session
+    return session
+
+
+def get(url, timeout=DEFAULT_TIMEOUT, headers=None, retries=fetch_policy.RETRIES, **kwargs):
+    """
+    GET url on its host's pooled session, paced by the per-host rate limiter.
+    Connection errors, timeouts, 429 and 5xx are retried with backoff (see
+    fetch_policy); raises CircuitOpenError once the host's breaker has tripped.
+    Otherwise same contract as requests.get.
+    """
+    breaker = fetch_policy.breaker_for(url)
+    session = session_for(url)
+    host = urlsplit(url).hostname or ""
+    attempt = 0
+    while True:
+        breaker.check()
+        rate_limit.acquire(url)
+        with _lock:
+            _requests[host] += 1
+        try:
+            r = session.get(url, timeout=timeout, headers=headers, **kwargs)
+        except (requests.ConnectionError, requests.Timeout):
+            if attempt >= retries:
+                breaker.record_failure()
+                raise
+            time.sleep(fetch_policy.backoff_delay(attempt))
+            attempt += 1
+            continue
+        if r.status_code not in fetch_policy.RETRY_STATUSES:
+            breaker.record_success()
+            return r
+        if attempt >= retries:
+            breaker.record_failure()
+            return r
+        delay = fetch_policy.retry_after_delay(r)
+        r.close()
+        time.sleep(fetch_policy.backoff_delay(attempt) if delay is None else delay)
+        attempt += 1
+
+
+def get_text(url, timeout=DEFAULT_TIMEOUT, use_cache=True):
+    """
+    Return the body of url as text, raising like raise_for_status() on errors.
+    With use_cache, a cached copy is revalidated with If-None-Match /
+    If-Modified-Since and reused on 304; fresh bodies with validators are stored.
+    """
+    cache = http_cache.default_cache() if use_cache else None
+    entry = cache.lookup(url) if cache else None
+    headers = cache.conditional_headers(entry) if entry else None
+    r = get(url, timeout=timeout, headers=headers)
+    if entry and r.status_code == 304:
+        text = cache.body(url)
+        if text is not None:
+            return text
+        # The cached body went away after the 304; fetch it unconditionally
+        r = get(url, timeout=timeout)
+    r.raise_for_status()
+    text = r.text
+    if cache:
+        cache.store(url, r, text)
+    return text
+
+
+def get_head(url, timeout=DEFAULT_TIMEOUT, chunk_size=8192, max_bytes=HEAD_MAX_BYTES):
+    """
+    Stream url and return its HTML up to and including </head>, closing the
+    connection as soon as that is seen instead of downloading the whole body.
+    Meant for <meta> tags (og:image, og:description). Raises like get_text().
+    """
+    marker = "</head>"
+    with get(url, timeout=timeout, stream=True) as r:
+        r.raise_for_status()
+        decoder = codecs.getincrementaldecoder(r.encoding or "utf-8")(errors="replace")
+        text = ""
+        received = 0
+        for chunk in r.iter_content(chunk_size):
+            received += len(chunk)
+            start = max(len(text) - len(marker), 0)
+            text += decoder.decode(chunk)
+            end = text.lower().find(marker, start)
+            if end != -1:
+                return text[:end + len(marker)]
+            if received >= max_bytes:
+                break
+        return text + decoder.decode(b"", final=True)
+
+
+def connection_stats():
+    """Return {host: {"requests", "opened", "reused"}} for every host fetched so far."""
+    with _lock:
+        hosts = set(_requests) | set(_opened)
+        return {
+            host: {"requests": _requests[host], "opened": _opened[host],
+                   "reused": max(_requests[host] - _opened[host], 0)}
+            for host in hosts
+        }
+
+
+def print_stats(file=None):
+    """Print one line per host with requests made and connections opened/reused."""
+    file = file or sys.stdout
+    for host, s in sorted(connection_stats().items()):
+        if s["requests"]:
+            print(f"  HTTP {host}: {s['requests']} requests, {s['opened']} connections opened, "
+                  f"{s['reused']} reused", file=file)
+    cache = http_cache.default_cache()
+    if cache.hits or cache.stored:
+        print(f"  HTTP cache: {cache.hits} not modified (304), {cache.stored} stored", file=file)
+    rate_limit.print_stats(file)
+    fetch_policy.print_stats(file)
@@ -14,17 +14,29 @@ Usage:
   python3 monitor.py              # Run full scan + publish
   python3 monitor.py --dry-run    # Preview without modifying files
   python3 monitor.py --no-push    # Update HTML but skip git push
+  python3 monitor.py --compact    # Only run the retention pass on events_db.json
+
+Retention: every scan is counted, and the scan in which each event was last
+seen recorded, in .cache/monitor_seen.json (SEEN_FILE, saved on every run). A
+compaction pass then moves events out of events_db.json into the gzipped
+events_archive.json.gz once their date is more than MONITOR_GRACE_DAYS in the
+past, or they have not been seen for MONITOR_MAX_MISSED_SCANS scans.
+
+events_db.json is only rewritten when something other than timestamps
+(VOLATILE_KEYS) changed. What each scan added, removed and changed per source
+is appended to change_log's changes.jsonl.
 """
 
 import os
 import re
 import sys
+import gzip
 import json
+import time
 import hashlib
 import subprocess
 import argparse
-import time as time_module
-from datetime import datetime
+from datetime import date, datetime, timedelta
 from pathlib import Path
 from html import escape
 
@@ -38,11 +50,28 @@ except ImportError:
     import requests
     from bs4 import BeautifulSoup
 
+import change_log
+import event_meta
+import event_store
+import eventbrite_listing
+import file_store
+import http_client
+import time_extract
+
 # ─── CONFIGURATION ──────────────────────────────────────────────────────────
 
 PROJECT_DIR = Path(__file__).parent
 HTML_FILE = PROJECT_DIR / "index.html"
 EVENTS_DB = PROJECT_DIR / "events_db.json"
+EVENTS_ARCHIVE = PROJECT_DIR / "events_archive.json.gz"
+# Scan counter and last-seen scan per event; kept out of events_db.json so
+# quiet scans, which do not rewrite it, still count
+SEEN_FILE = PROJECT_DIR / ".cache" / "monitor_seen.json"
+# Retention: days an event stays after its date, and scans it may go unseen
+GRACE_DAYS = int(os.environ.get("MONITOR_GRACE_DAYS", "7"))
+MAX_MISSED_SCANS = int(os.environ.get("MONITOR_MAX_MISSED_SCANS", "72"))
+# Keys that change on every scan; a scan that changes nothing else is not saved
+VOLATILE_KEYS = ("scraped_at", "last_scan")
 GIT_REMOTE = "origin"
 GIT_BRANCH = "main"
 EVENTS_GRID_START = "<!-- EVENTS_GRID_START -->"
@@ -50,15 +79,11 @@ EVENTS_GRID_END = "<!-- EVENTS_GRID_END -->"
 
 SOURCES = [
     {
-        "name": "Eventbrite Free",
-        "key": "eventbrite",
-        "url": "https://www.eventbrite.com.pe/d/peru--miraflores/free--events/",
-        "scraper": "scrape_eventbrite",
-    },
-    {
-        "name": "Eventbrite All",
+        # "free" and "all" listings are read together and deduplicated
+        "name": "Eventbrite",
         "key": "eventbrite",
         "url": "https://www.eventbrite.com.pe/d/peru--miraflores/events/",
+        "free_url": "https://www.eventbrite.com.pe/d/peru--miraflores/free--events/",
         "scraper": "scrape_eventbrite",
     },
     {
@@ -75,14 +100,6 @@ SOURCES = [
     },
 ]
 
-HEADERS = {
-    "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
-                  "AppleWebKit/537.36 (KHTML, like Gecko) "
-                  "Chrome/120.0.0.0 Safari/537.36",
-    "Accept-Language": "es-PE,es;q=0.9,en;q=0.8",
-    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-}
-
 CATEGORY_KEYWORDS = {
     "Music": ["concert", "concierto", "music", "música", "live", "band", "dj",
               "festival", "rock", "jazz", "salsa", "cumbia", "reggaeton", "opera",
@@ -200,104 +217,74 @@ EVENTBRITE_DATE_PATTERNS = [
 ]
 
 
+# All of the above in one scan; the earliest pattern in the list wins
+DATE_EXTRACTOR = time_extract.TimeExtractor.from_patterns(EVENTBRITE_DATE_PATTERNS, anchor=r"\d[:.]\d\d")
+# Card containers: walk up from an event link to the first Container/NestedAction/Stack class
+EVENTBRITE_CARD = eventbrite_listing.class_boundary(("Container", "NestedAction", "Stack"), max_levels=5)
+
+
 def extract_date_from_text(text):
     """Extract a human-readable date+time from unstructured text."""
     if not text:
         return ""
     text = text.replace('\n', ' ').strip()
-
-    for pattern in EVENTBRITE_DATE_PATTERNS:
-        m = pattern.search(text)
-        if m:
-            return m.group(0).strip()
-    return ""
+    return DATE_EXTRACTOR.extract(text)
 
 
 # ─── SCRAPERS ────────────────────────────────────────────────────────────────
 
 def fetch_page(url, timeout=15):
     try:
-        resp = requests.get(url, headers=HEADERS, timeout=timeout)
-        resp.raise_for_status()
-        return BeautifulSoup(resp.text, "lxml")
+        return BeautifulSoup(http_client.get_text(url, timeout=timeout), "lxml")
+    except http_client.CircuitOpenError:
+        return None
     except Exception as e:
         print(f"  {C.RED}✗ Error fetching {url}: {e}{C.END}")
         return None
 
 
-def scrape_eventbrite(source):
+def _card_fields(card):
+    """Title, date, location and image from a card (parsed once per card)."""
+    node = card.node
+    title_el = node.select_one('h2, h3')
+    loc_el = node.select_one(
+        '[data-testid="event-card-location"], '
+        '.card-text--truncated__one'
+    )
+    img_el = node.select_one('img[src*="img.evbuc"], img[data-src], img')
+    return {
+        "title": title_el.get_text(strip=True) if title_el else '',
+        # FIX: Extract date+time from the card's full text using regex
+        "date": extract_date_from_text(card.text),
+        "location": loc_el.get_text(strip=True) if loc_el else "Miraflores, Lima",
+        "image": (img_el.get('src') or img_el.get('data-src', '')) if img_el else "",
+    }
+
+
+def _events_from_cards(soup, is_free_page):
     """
     FIX: Eventbrite renders dates as text inside card divs, not in dedicated
     <time> or [data-testid] elements. We extract dates from the card's full
     text content using regex patterns.
     """
-    soup = fetch_page(source["url"])
-    if not soup:
-        return []
-
     events = []
-    is_free_page = "free" in source["url"]
-    seen_urls = set()
 
-    # Find all event links
-    all_links = soup.select('a[href*="/e/"]')
+    # Each link is mapped to its card container (typically 3-4 levels up) once;
+    # duplicate link elements are dropped by URL without the query string
+    index = eventbrite_listing.CardIndex(
+        soup, EVENTBRITE_CARD, key=lambda url: url.split('?')[0])
 
-    for link in all_links:
+    for url, link, card in index:
         try:
-            url = link.get('href', '')
-            if '/e/' not in url:
-                continue
-            if not url.startswith('http'):
-                url = 'https://www.eventbrite.com.pe' + url
-
-            # Deduplicate by URL (Eventbrite renders duplicate link elements)
-            base_url = url.split('?')[0]
-            if base_url in seen_urls:
-                continue
-            seen_urls.add(base_url)
-
-            # Walk up to the card container (typically 3-4 levels up)
-            card = link
-            for _ in range(5):
-                if card.parent and card.parent.name != 'body':
-                    card = card.parent
-                # Stop at meaningful container boundaries
-                if card.get('class') and any(
-                    'Container' in c or 'NestedAction' in c or 'Stack' in c
-                    for c in card.get('class', [])
-                ):
-                    break
-
-            card_text = card.get_text(' ', strip=True) if card else ''
-
-            # Extract title — find the first h2/h3 or bold text
-            title_el = card.select_one('h2, h3') if card else None
-            title = title_el.get_text(strip=True) if title_el else ''
-            if not title:
-                # Fall back: the link text itself, cleaned
-                title = link.get_text(strip=True)
+            fields = card.fields(_card_fields)
+            # Title: the card's first h2/h3, else the link text itself
+            title = fields["title"] or link.get_text(strip=True)
             if not title or len(title) < 5:
                 continue
 
-            # FIX: Extract date+time from the card's full text using regex
-            date = extract_date_from_text(card_text)
-
-            # Extract location — look for text after the date, typically place info
-            loc_el = card.select_one(
-                '[data-testid="event-card-location"], '
-                '.card-text--truncated__one'
-            )
-            location = loc_el.get_text(strip=True) if loc_el else "Miraflores, Lima"
-
-            # Extract image
-            img_el = card.select_one('img[src*="img.evbuc"], img[data-src], img')
-            image = ""
-            if img_el:
-                image = img_el.get('src') or img_el.get('data-src', '')
-
             events.append(make_event(
                 title=title, url=url, source_key="eventbrite",
-                date=date, location=location, image_url=image,
+                date=fields["date"], location=fields["location"], image_url=fields["image"],
                 is_free=is_free_page
             ))
         except Exception:
@@ -306,6 +293,41 @@ def scrape_eventbrite(source):
     return events
 
 
+def _event_from_listing(ev, is_free_page):
+    """make_event() from an event in a listing's embedded JSON."""
+    if len(ev["title"]) < 5:
+        return None
+    is_free = ev["is_free"] or is_free_page
+    event = make_event(
+        title=ev["title"], url=ev["url"], source_key="eventbrite",
+        date=f"{ev['start_date']} {ev['start_time']}",
+        location=ev["venue"] or "Miraflores, Lima",
+        description=ev["summary"], image_url=ev["image"],
+        is_free=is_free, price="" if is_free else ev["price"],
+    )
+    # The payload already has what the detail page would give
+    if event["date"] and event["description"] and event["image_url"]:
+        event["enriched"] = True
+    return event
+
+
+def scrape_eventbrite(source):
+    """
+    Events from the embedded JSON of the source's listings ("free" and "all",
+    every page), deduplicated by URL. A listing without a payload falls back to
+    parsing the rendered cards of its first page.
+    """
+    urls = [u for u in (source.get("free_url"), source["url"]) if u]
+    events = []
+    for listing in eventbrite_listing.fetch_listings(urls):
+        is_free_page = "free" in listing.url
+        if listing.events is not None:
+            events.extend(e for e in (_event_from_listing(ev, is_free_page) for ev in listing.events) if e)
+        elif listing.html:
+            events.extend(_events_from_cards(BeautifulSoup(listing.html, "lxml"), is_free_page))
+    return eventbrite_listing.dedupe_events(events)
+
+
 def scrape_enlima(source):
     """
     FIX: EnLima uses a <table class="bloque-calendario"> with structured rows.
@@ -501,92 +523,248 @@ def enrich_event(event, db):
             event["enriched"] = True
             return False
 
-    try:
-        soup = fetch_page(event["url"], timeout=10)
-        if not soup:
-            return False
-
-        # Description: og:description → meta description → first <p>
-        desc = ""
-        og_desc = soup.select_one('meta[property="og:description"]')
-        if og_desc and og_desc.get("content"):
-            desc = og_desc["content"].strip()
-        if not desc:
-            meta_desc = soup.select_one('meta[name="description"]')
-            if meta_desc and meta_desc.get("content"):
-                desc = meta_desc["content"].strip()
-        if desc:
-            event["description"] = desc[:300]
-
-        # Date: try multiple strategies
-        date_val = ""
-
-        # Strategy 1: <time datetime="..."> with text content
-        time_el = soup.select_one('time[datetime]')
-        if time_el:
-            date_val = time_el.get_text(strip=True) or time_el.get("datetime", "")
-
-        # Strategy 2: Schema.org itemprop
-        if not date_val:
-            start_el = soup.select_one('[itemprop="startDate"]')
-            if start_el:
-                date_val = start_el.get("content") or start_el.get("datetime") or start_el.get_text(strip=True)
-
-        # Strategy 3: Open Graph event meta
-        if not date_val:
-            start_meta = soup.select_one('meta[property="event:start_time"]')
-            if not start_meta:
-                start_meta = soup.select_one('meta[property="event:start_date"]')
-            if start_meta and start_meta.get("content"):
-                date_val = start_meta["content"]
-
-        # Strategy 4: JSON-LD structured data
-        if not date_val:
-            for script in soup.select('script[type="application/ld+json"]'):
-                try:
-                    data = json.loads(script.string or "")
-                    if isinstance(data, list):
-                        data = data[0] if data else {}
-                    if data.get("@type") == "Event" and data.get("startDate"):
-                        date_val = data["startDate"]
-                        break
-                except (json.JSONDecodeError, KeyError, IndexError):
-                    continue
+    meta = event_meta.lookup(event["url"], ("description", "start_date", "text", "image"), timeout=10)
+    if not meta:
+        return False
 
-        # Strategy 5: Regex from page text (last resort)
-        if not date_val:
-            body_text = soup.select_one('body')
-            if body_text:
-                date_val = extract_date_from_text(body_text.get_text(' ', strip=True)[:1000])
+    # Description: og:description → meta description
+    if meta["description"]:
+        event["description"] = meta["description"][:300]
 
-        if date_val:
-            event["date"] = date_val.strip()
+    # Date: structured start date (time[datetime], itemprop, event meta, JSON-LD),
+    # then regex over the page text as a last resort
+    date_val = meta["start_date"] or extract_date_from_text(meta["text"])
+    if date_val:
+        event["date"] = date_val.strip()
 
-        # Image: og:image
-        og_img = soup.select_one('meta[property="og:image"]')
-        if og_img and og_img.get("content"):
-            event["image_url"] = og_img["content"].strip()
+    # Image: og:image
+    if meta["image"]:
+        event["image_url"] = meta["image"]
 
-        event["enriched"] = True
-        return True
-    except Exception:
-        pass
-    return False
+    event["enriched"] = True
+    return True
 
 
 # ─── DATABASE ────────────────────────────────────────────────────────────────
 
+def _sqlite_db():
+    """event_store's database when EVENT_STORE=sqlite (seeded from events_db.json once), else None."""
+    if not event_store.enabled():
+        return None
+    store = event_store.default_store()
+    if not store.has_monitor() and EVENTS_DB.exists():
+        with open(EVENTS_DB, "r", encoding="utf-8") as f:
+            store.save_monitor(json.load(f))
+    return store
+
+
 def load_db():
+    store = _sqlite_db()
+    if store:
+        return store.load_monitor()
     if EVENTS_DB.exists():
         with open(EVENTS_DB, "r", encoding="utf-8") as f:
             return json.load(f)
     return {"events": {}, "last_scan": None}
 
 
-def save_db(db):
-    db["last_scan"] = datetime.now().isoformat()
-    with open(EVENTS_DB, "w", encoding="utf-8") as f:
-        json.dump(db, f, indent=2, ensure_ascii=False)
+def save_db(db, loaded_stamp=None, touched=None, removed=()):
+    """
+    Write the database atomically under its lock. If it was replaced since this
+    run loaded it (file_store.stamp() differs from loaded_stamp), the events in
+    `touched` are merged into (and `removed` dropped from) the current copy
+    instead of overwriting it. With EVENT_STORE=sqlite only those rows are
+    written, in one transaction, and events_db.json is exported from the store
+    (skipped if unchanged) so the committed copy stays current.
+    """
+    store = _sqlite_db()
+    if store:
+        db["last_scan"] = datetime.now().isoformat()
+        store.save_monitor(db, touched)
+        if removed:
+            store.delete_monitor(removed)
+        with file_store.locked(EVENTS_DB):
+            file_store.write_json_if_changed(EVENTS_DB, store.load_monitor(), volatile=VOLATILE_KEYS, indent=2)
+        return db
+    with file_store.locked(EVENTS_DB):
+        if touched is not None and file_store.stamp(EVENTS_DB) != loaded_stamp:
+            print(f"  {C.YELLOW}⚠ {EVENTS_DB.name} changed during the scan; merging into the current copy{C.END}")
+            current = load_db()
+            current["events"].update({eid: db["events"][eid] for eid in touched if eid in db["events"]})
+            for eid in removed:
+                current["events"].pop(eid, None)
+            db = current
+        db["last_scan"] = datetime.now().isoformat()
+        if not file_store.write_json_if_changed(EVENTS_DB, db, volatile=VOLATILE_KEYS, indent=2):
+            print(f"  {C.DIM}{EVENTS_DB.name} unchanged apart from timestamps; not rewritten{C.END}")
+    return db
+
+
+# ─── RETENTION ───────────────────────────────────────────────────────────────
+
+MONTHS = {
+    "ene": 1, "jan": 1, "feb": 2, "mar": 3, "abr": 4, "apr": 4, "may": 5, "jun": 6,
+    "jul": 7, "ago": 8, "aug": 8, "sep": 9, "set": 9, "oct": 10, "nov": 11, "dic": 12, "dec": 12,
+}
+_MONTH = r'(' + '|'.join(MONTHS) + r')[a-záéíóú]*\.?'
+ISO_DATE_RE = re.compile(r'(\d{4})-(\d{2})-(\d{2})')
+# "23 mar", "23 de marzo de 2026", "01 de enero 2026 - 31 de diciembre 2026"
+DAY_MONTH_RE = re.compile(r'\b(\d{1,2})\s*(?:de\s+)?' + _MONTH + r'(?:,?\s*(?:de\s+)?(\d{4}))?', re.IGNORECASE)
+# "Mar 18 at 10:00 am", "Sat, Mar 22, 2026"
+MONTH_DAY_RE = re.compile(r'\b' + _MONTH + r'\s+(\d{1,2})\b(?:,?\s*(\d{4}))?', re.IGNORECASE)
+RELATIVE_DAYS = {"hoy": 0, "today": 0, "tomorrow": 1, "mañana": 1}
+
+
+def event_date(event):
+    """
+    Last calendar date in the event's date text (the end of a range), or None
+    if it has none. Years missing from the text are taken from when the event
+    was scraped, assuming listed dates are upcoming.
+    """
+    text = (event.get("date") or "").strip()
+    if not text:
+        return None
+    try:
+        seen = datetime.fromisoformat(event.get("scraped_at") or "").date()
+    except ValueError:
+        seen = date.today()
+    dates = [(y, m, d) for y, m, d in ISO_DATE_RE.findall(text)]
+    if not dates:
+        matches = [(d, m, y) for d, m, y in DAY_MONTH_RE.findall(text)]
+        matches = matches or [(d, m, y) for m, d, y in MONTH_DAY_RE.findall(text)]
+        dates = [(y, MONTHS[m.lower()], d) for d, m, y in matches]
+    found = []
+    for y, m, d in dates:
+        try:
+            when = date(int(y or seen.year), int(m), int(d))
+        except ValueError:
+            continue
+        if not y and when < seen - timedelta(days=60):
+            # "5 ene" listed in December
+            when = when.replace(year=when.year + 1)
+        found.append(when)
+    if found:
+        return max(found)
+    word = text.split()[0].lower().strip(",")
+    if word in RELATIVE_DAYS:
+        return seen + timedelta(days=RELATIVE_DAYS[word])
+    return None
+
+
+def load_seen():
+    """{"scans": n, "events": {id: {"scan": n, "at": iso}}} from SEEN_FILE."""
+    try:
+        with open(SEEN_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"scans": 0, "events": {}}
+
+
+def save_seen(seen, removed=()):
+    """
+    Write SEEN_FILE under its lock, merged with the on-disk copy so an
+    overlapping run's stamps are kept (the later scan wins per event).
+    """
+    SEEN_FILE.parent.mkdir(parents=True, exist_ok=True)
+    with file_store.locked(SEEN_FILE):
+        current = load_seen()
+        events = current["events"]
+        for eid, stamp in seen["events"].items():
+            if stamp["scan"] >= events.get(eid, {}).get("scan", -1):
+                events[eid] = stamp
+        for eid in removed:
+            events.pop(eid, None)
+        current["scans"] = max(current["scans"], seen["scans"])
+        file_store.atomic_write_json(SEEN_FILE, current, separators=(",", ":"))
+
+
+def mark_seen(seen, event_ids):
+    """Start a new scan and stamp event_ids as seen in it."""
+    seen["scans"] += 1
+    now = datetime.now().isoformat(timespec="seconds")
+    for eid in event_ids:
+        seen["events"][eid] = {"scan": seen["scans"], "at": now}
+
+
+def _db_footprint(db):
+    """(bytes, seconds to json.loads) of db as save_db writes it."""
+    text = json.dumps(db, ensure_ascii=False, indent=2)
+    start = time.perf_counter()
+    json.loads(text)
+    return len(text.encode("utf-8")), time.perf_counter() - start
+
+
+def compact_db(db, seen, today=None):
+    """
+    Move expired events from db into EVENTS_ARCHIVE and report the change.
+    Returns the removed ids.
+    """
+    today = today or date.today()
+    scans = seen["scans"]
+    expired = {}
+    for eid, ev in db["events"].items():
+        stamp = seen["events"].get(eid)
+        if stamp is None:
+            # Events not tracked yet (e.g. a fresh cache) start their count now
+            stamp = seen["events"][eid] = {"scan": scans, "at": None}
+        if stamp["at"] and stamp["scan"] == scans:
+            # Still listed by a source: keep it so it is not re-enriched next scan
+            continue
+        when = event_date(ev)
+        if when and when < today - timedelta(days=GRACE_DAYS):
+            expired[eid] = "past"
+        elif scans - stamp["scan"] >= MAX_MISSED_SCANS:
+            expired[eid] = "unseen"
+    if not expired:
+        print(f"  {C.DIM}Retention: nothing to archive ({len(db['events'])} events){C.END}")
+        return []
+
+    before = _db_footprint(db)
+    archived_at = datetime.now().isoformat()
+    with file_store.locked(EVENTS_ARCHIVE):
+        archive = load_archive()
+        for eid, reason in expired.items():
+            archive["events"][eid] = dict(db["events"].pop(eid), archived_at=archived_at, archived_reason=reason)
+        data = json.dumps(archive, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        # mtime=0 so an unchanged archive compresses to the same bytes
+        file_store.atomic_write(EVENTS_ARCHIVE, gzip.compress(data, mtime=0))
+    after = _db_footprint(db)
+    past = sum(1 for reason in expired.values() if reason == "past")
+    print(f"  {C.GREEN}✓ Archived {len(expired)} events ({past} past, {len(expired) - past} unseen) "
+          f"to {EVENTS_ARCHIVE.name}{C.END}")
+    print(f"    {C.DIM}{EVENTS_DB.name}: {before[0] / 1024:.1f} KB → {after[0] / 1024:.1f} KB, "
+          f"load {before[1] * 1000:.1f} ms → {after[1] * 1000:.1f} ms{C.END}")
+    return list(expired)
+
+
+def load_archive():
+    if EVENTS_ARCHIVE.exists():
+        with gzip.open(EVENTS_ARCHIVE, "rt", encoding="utf-8") as f:
+            return json.load(f)
+    return {"events": {}}
+
+
+def run_compact():
+    db_stamp = file_store.stamp(EVENTS_DB)
+    db = load_db()
+    previous = dict(db["events"])
+    seen = load_seen()
+    removed = compact_db(db, seen)
+    if removed:
+        save_db(db, db_stamp, touched=set(), removed=removed)
+        log_changes(previous, db["events"])
+    save_seen(seen, removed)
+
+
+def log_changes(before, after):
+    """Record per source what this run added, removed and changed in change_log's feed."""
+    for source in sorted({ev.get("source") or "" for ev in (*before.values(), *after.values())}):
+        delta = change_log.diff_events({eid: ev for eid, ev in before.items() if ev.get("source") == source},
+                                       {eid: ev for eid, ev in after.items() if ev.get("source") == source},
+                                       volatile=VOLATILE_KEYS)
+        if change_log.record("monitor", source, delta):
+            n = change_log.counts(delta)
+            print(f"  {C.DIM}{source}: {n['added']} new, {n['removed']} removed, {n['changed']} changed{C.END}")
 
 
 # ─── TAILWIND CARD GENERATION (matches existing UI exactly) ─────────────────
@@ -762,7 +940,10 @@ def run_monitor(dry_run=False, no_push=False):
     if dry_run:
         print(f"  {C.YELLOW}⚡ DRY RUN — no files will be modified{C.END}\n")
 
+    db_stamp = file_store.stamp(EVENTS_DB)
     db = load_db()
+    # Events as loaded, to log what this scan added, removed and changed
+    previous = dict(db["events"])
     all_events = []
     seen_ids = set()
 
@@ -776,7 +957,8 @@ def run_monitor(dry_run=False, no_push=False):
             continue
 
         events = scraper_fn(source)
-        print(f"    Found {len(events)} event(s)")
+        new_count = len({e["id"] for e in events} - previous.keys())
+        print(f"    Found {len(events)} event(s), {new_count} new")
 
         for e in events:
             db["events"][e["id"]] = e
@@ -785,13 +967,15 @@ def run_monitor(dry_run=False, no_push=False):
                 all_events.append(e)
                 # Show date extraction result
                 date_preview = e.get("date", "")[:40] or "(no date)"
-                print(f"      {C.DIM}+ {e['title'][:45]} → {date_preview}{C.END}")
+                mark = "+" if e["id"] not in previous else "·"
+                print(f"      {C.DIM}{mark} {e['title'][:45]} → {date_preview}{C.END}")
         print()
 
     all_events.sort(key=lambda e: (e.get("date") or "zzz", e["title"]))
 
     print(f"{'─' * 60}")
-    print(f"  {C.BOLD}Total: {len(all_events)} unique events from all sources{C.END}")
+    new_total = len(seen_ids - previous.keys())
+    print(f"  {C.BOLD}Total: {len(all_events)} unique events from all sources, {new_total} new{C.END}")
 
     if dry_run:
         print(f"\n  {C.YELLOW}Dry run complete — no files modified.{C.END}\n")
@@ -804,11 +988,15 @@ def run_monitor(dry_run=False, no_push=False):
         db["events"][e["id"]] = e
         if did_fetch:
             enriched_count += 1
-            time_module.sleep(0.4)
         if (i + 1) % 10 == 0:
             print(f"    {C.DIM}Processed {i + 1}/{len(all_events)}{C.END}")
     print(f"  {C.GREEN}✓ Enriched {enriched_count} events from detail pages{C.END}")
-    save_db(db)
+    seen = load_seen()
+    mark_seen(seen, seen_ids)
+    removed = compact_db(db, seen)
+    save_db(db, db_stamp, touched=seen_ids, removed=removed)
+    save_seen(seen, removed)
+    log_changes(previous, db["events"])
 
     print(f"\n  {C.CYAN}▸ Updating homepage...{C.END}")
     changed = replace_events_grid(all_events)
@@ -819,6 +1007,8 @@ def run_monitor(dry_run=False, no_push=False):
     elif no_push and changed:
         print(f"\n  {C.YELLOW}⚠ Skipping git push (--no-push){C.END}")
 
+    event_meta.print_stats()
+    http_client.print_stats()
     print(f"\n{C.GREEN}  ✓ Done!{C.END}\n")
 
 
@@ -830,5 +1020,10 @@ if __name__ == "__main__":
                         help="Preview without modifying files")
     parser.add_argument("--no-push", action="store_true",
                         help="Update HTML but skip git push")
+    parser.add_argument("--compact", action="store_true",
+                        help="Only archive expired events from events_db.json")
     args = parser.parse_args()
-    run_monitor(dry_run=args.dry_run, no_push=args.no_push)
+    if args.compact:
+        run_compact()
+    else:
+        run_monitor(dry_run=args.dry_run, no_push=args.no_push)
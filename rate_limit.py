@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Per-host token-bucket rate limiter for politeness towards the scraped sites.
+
+Each host gets a bucket refilled at `rate` requests/second holding at most
+`burst` tokens, so requests can overlap up to that rate instead of being
+serialized behind fixed sleeps. Limits are set per source in LIMITS and can be
+overridden with RATE_LIMITS="enlima.pe=5:6,teleticket.com.pe=3:3" (rate:burst;
+entries without a positive, finite rate and burst are ignored with a warning).
+acquire() blocks the calling thread and records how long callers actually
+waited so runs can report time spent on politeness.
+"""
+import math
+import os
+import sys
+import threading
+import time
+from urllib.parse import urlsplit
+
+# host suffix -> (requests per second, burst)
+LIMITS = {
+    "enlima.pe": (5.0, 6),
+    "teleticket.com.pe": (4.0, 4),
+    "eventbrite.com.pe": (3.0, 3),
+}
+DEFAULT_LIMIT = (3.0, 3)
+
+
+def _parse_overrides(value):
+    out = {}
+    for part in (value or "").split(","):
+        host, _, spec = part.strip().partition("=")
+        rate, _, burst = spec.partition(":")
+        host = host.strip().lower()
+        if not host:
+            continue
+        try:
+            limit = (float(rate), int(burst or 1))
+        except ValueError:
+            limit = None
+        if limit is None or not (math.isfinite(limit[0]) and limit[0] > 0 and limit[1] > 0):
+            print(f"  Ignoring RATE_LIMITS entry {part.strip()!r} (need rate>0 and burst>0)", file=sys.stderr)
+            continue
+        out[host] = limit
+    return out
+
+
+LIMITS.update(_parse_overrides(os.environ.get("RATE_LIMITS")))
+
+
+class TokenBucket:
+    def __init__(self, rate, burst):
+        self.rate = float(rate)
+        self.burst = max(int(burst), 1)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self.waited = 0.0
+        self.acquired = 0
+        self._lock = threading.Lock()
+
+    def _reserve(self):
+        """Take one token, going into debt if needed; return seconds to wait."""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+            self.waited += wait
+            self.acquired += 1
+            return wait
+
+    def acquire(self):
+        wait = self._reserve()
+        if wait:
+            time.sleep(wait)
+
+
+_buckets = {}
+_lock = threading.Lock()
+
+
+def limit_for(host):
+    """(rate, burst) configured for host, matching LIMITS keys as domain suffixes."""
+    for suffix, limit in LIMITS.items():
+        if host == suffix or host.endswith("." + suffix):
+            return limit
+    return DEFAULT_LIMIT
+
+
+def bucket_for(url):
+    host = (urlsplit(url).hostname or "").lower()
+    with _lock:
+        bucket = _buckets.get(host)
+        if bucket is None:
+            bucket = _buckets[host] = TokenBucket(*limit_for(host))
+    return bucket
+
+
+def acquire(url):
+    """Block the calling thread until a request to url's host is allowed."""
+    bucket_for(url).acquire()
+
+
+def print_stats(file=None):
+    """Print, per host, how long callers waited on the limiter this run."""
+    with _lock:
+        buckets = sorted(_buckets.items())
+    for host, bucket in buckets:
+        if bucket.acquired:
+            print(f"  Rate limit {host}: waited {bucket.waited:.1f}s over {bucket.acquired} requests "
+                  f"({bucket.rate:g}/s, burst {bucket.burst})", file=file or sys.stdout)
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Scaling benchmark for enlima_calendar.dedupe_repeating_events against the old
+implementation (per repeating event, rebuild every day's list), on synthetic
+calendars shaped like events_by_day.json at 1x, 10x and 100x its size.
+
+  python3 scripts/bench_dedupe.py                  # 1x 10x 100x, old one up to 10x
+  python3 scripts/bench_dedupe.py --scales 1 10 --legacy-up-to 1
+"""
+import argparse
+import copy
+import random
+import sys
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from enlima_calendar import dedupe_repeating_events, event_key, format_date_short  # noqa: E402
+
+# Today's calendar: ~375 days, ~6.4k placements, ~60 repeating events, ~180 one-offs
+BASE_DAYS = 375
+BASE_REPEATING = 61
+BASE_SINGLE = 183
+
+
+def legacy_dedupe(events_by_day):
+    """The previous implementation, kept verbatim for comparison."""
+    by_event = {}
+    for date_key in sorted(events_by_day.keys()):
+        for ev in events_by_day[date_key]:
+            k = event_key(ev)
+            if k not in by_event:
+                by_event[k] = []
+            by_event[k].append((date_key, dict(ev)))
+    for k, date_ev_list in by_event.items():
+        if len(date_ev_list) < 2:
+            continue
+        dates = sorted(d[0] for d in date_ev_list)
+        first_date = dates[0]
+        last_date = dates[-1]
+        ev = date_ev_list[0][1]
+        ev["schedule"] = f"Del {format_date_short(first_date)} al {format_date_short(last_date)}"
+        for date_key in events_by_day:
+            events_by_day[date_key] = [
+                e for e in events_by_day[date_key]
+                if event_key(e) != k
+            ]
+        events_by_day[first_date].append(ev)
+    return events_by_day
+
+
+def synthetic_calendar(scale, seed=0):
+    rng = random.Random(seed)
+    start = date(2026, 1, 1)
+    days = [(start + timedelta(days=i)).isoformat() for i in range(BASE_DAYS * scale)]
+    calendar = {d: [] for d in days}
+
+    def event(n):
+        return {"time": f"{rng.randint(10, 22)}:00", "type": "Teatro", "title": f"Evento {n}",
+                "url": f"https://enlima.pe/evento/{n}", "venue": "Centro Cultural", "district": "Miraflores",
+                "price": "", "source": "EnLima"}
+
+    n = 0
+    for _ in range(BASE_REPEATING * scale):
+        ev = event(n)
+        n += 1
+        first = rng.randrange(len(days))
+        for d in days[first:first + rng.randint(2, 200)]:
+            calendar[d].append(dict(ev))
+    for _ in range(BASE_SINGLE * scale):
+        ev = event(n)
+        n += 1
+        day = calendar[rng.choice(days)]
+        day.append(ev)
+        # Now and then an event is listed twice on the same day
+        if rng.random() < 0.02:
+            day.append(dict(ev))
+    for events in calendar.values():
+        rng.shuffle(events)
+    # Day order in the file is not guaranteed to be sorted
+    keys = list(calendar)
+    rng.shuffle(keys)
+    return {k: calendar[k] for k in keys}
+
+
+def timed(fn, calendar):
+    start = time.perf_counter()
+    result = fn(calendar)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--legacy-up-to", type=int, default=10,
+                        help="run the old implementation only up to this scale (it is quadratic)")
+    args = parser.parse_args()
+
+    ok = True
+    for scale in args.scales:
+        calendar = synthetic_calendar(scale)
+        placements = sum(len(v) for v in calendar.values())
+        print(f"{scale:>4}x: {len(calendar)} days, {placements} placements")
+        new_s, new = timed(dedupe_repeating_events, copy.deepcopy(calendar))
+        print(f"    single pass : {new_s * 1000:10.1f} ms")
+        if scale <= args.legacy_up_to:
+            old_s, old = timed(legacy_dedupe, copy.deepcopy(calendar))
+            same = old == new and list(old) == list(new)
+            ok = ok and same
+            print(f"    old         : {old_s * 1000:10.1f} ms  ({old_s / max(new_s, 1e-9):.0f}x slower)")
+            print(f"    identical   : {'yes' if same else 'NO'}")
+    return 0 if ok else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Benchmark EnLima day-page parsing: full BeautifulSoup tree vs the <table>-only
+fast path in enlima_calendar.parse_day_html, and check both give the same events.
+
+  python3 scripts/bench_enlima_parse.py                 # day pages saved in .cache/http
+  python3 scripts/bench_enlima_parse.py day1.html ...   # specific recorded pages
+"""
+import json
+import sys
+import time
+import zlib
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import enlima_calendar  # noqa: E402
+import http_cache  # noqa: E402
+
+REPEAT = 3
+
+
+def load_pages(paths):
+    if paths:
+        return [Path(p).read_text(encoding="utf-8", errors="replace") for p in paths]
+    cache = http_cache.HttpCache()
+    index_file = cache.directory / "index.json"
+    if not index_file.exists():
+        return []
+    with open(index_file, "r", encoding="utf-8") as f:
+        urls = [u for u in json.load(f) if "/calendario-cultural/dia/" in u]
+    pages = []
+    for url in sorted(urls):
+        body = cache._body_file(url)
+        if body.exists():
+            pages.append(zlib.decompress(body.read_bytes()).decode("utf-8", errors="replace"))
+    return pages
+
+
+def bench(pages, fast):
+    best = float("inf")
+    events = None
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        events = [enlima_calendar.parse_day_page(enlima_calendar.parse_day_html(p, fast=fast), "")
+                  for p in pages]
+        best = min(best, time.perf_counter() - start)
+    return best, events
+
+
+def main():
+    pages = load_pages(sys.argv[1:])
+    if not pages:
+        print("No recorded day pages found (run enlima_calendar.py to fill .cache/http, or pass .html files).")
+        return 1
+    print(f"{len(pages)} day pages, {sum(len(p) for p in pages) / 1024:.0f} KB of HTML, best of {REPEAT} runs")
+    full_s, full = bench(pages, fast=False)
+    fast_s, fast = bench(pages, fast=True)
+    print(f"  full tree   : {full_s * 1000:8.1f} ms  ({full_s / len(pages) * 1000:.1f} ms/page)")
+    print(f"  table only  : {fast_s * 1000:8.1f} ms  ({fast_s / len(pages) * 1000:.1f} ms/page)")
+    print(f"  speedup     : {full_s / max(fast_s, 1e-9):.1f}x")
+    same = sum(1 for a, b in zip(full, fast) if a == b)
+    print(f"  identical events: {same}/{len(pages)} pages")
+    return 0 if same == len(pages) else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
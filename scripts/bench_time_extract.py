@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: single-pass time_extract engine vs the old regex cascade
+that fetch_event_time ran over the raw HTML of Teleticket detail pages.
+
+  python3 scripts/bench_time_extract.py                 # pages saved in .cache/http
+  python3 scripts/bench_time_extract.py page1.html ...  # specific saved pages
+"""
+import re
+import sys
+import time
+import zlib
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import time_extract  # noqa: E402
+
+CACHE_DIR = ROOT / ".cache" / "http"
+REPEAT = 5
+
+
+def legacy_time(text):
+    """The pre-engine cascade: up to seven re.search calls over the whole page."""
+    norm = time_extract.normalize_time
+    m = re.search(r"(\d{1,2}:\d{2})\s*[Hh]rs?\.?", text)
+    if m:
+        return norm(m.group(1))
+    m = re.search(r"(?:inicio|comenzar|comienza|a las|las)\s+(\d{1,2}:\d{2}\s*[ap]\.?m\.?)", text, re.I)
+    if m:
+        return norm(m.group(1))
+    m = re.search(r"(?:lun|mar|mi[eé]|jue|vie|s[aá]b|dom)\.?\s+\d{1,2}\s+\w+\s+(\d{1,2}:\d{2})", text, re.I)
+    if m:
+        return norm(m.group(1))
+    m = re.search(r"\d{1,2}[-/]\d{1,2}[-/]\d{2,4}\s+(\d{1,2}:\d{2})", text)
+    if m:
+        return norm(m.group(1))
+    m = re.search(r"\b(\d{1,2}:\d{2}\s*[ap]\.?m\.?)\b", text, re.I)
+    if m:
+        return norm(m.group(1))
+    m = re.search(r"\b([0-2]?\d:\d{2})\s*(?:[Hh]rs?|[Hh]ora)?", text)
+    if m:
+        h, mi = m.group(1).split(":")
+        if 0 <= int(h) <= 23 and 0 <= int(mi) <= 59:
+            return norm(m.group(1))
+    m = re.search(r"\b(0?[1-9]|1[0-2]):(\d{2})\s*([ap]\.?m\.?)?", text, re.I)
+    if m:
+        return norm(m.group(0).strip())
+    return ""
+
+
+def load_pages(paths):
+    pages = []
+    if paths:
+        for p in paths:
+            pages.append(Path(p).read_text(encoding="utf-8", errors="replace"))
+    elif CACHE_DIR.is_dir():
+        for p in sorted(CACHE_DIR.glob("*.z")):
+            try:
+                pages.append(zlib.decompress(p.read_bytes()).decode("utf-8", errors="replace"))
+            except zlib.error:
+                continue
+    return [p for p in pages if "<html" in p[:2000].lower()]
+
+
+def bench(fn, pages):
+    best = float("inf")
+    results = None
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        results = [fn(p) for p in pages]
+        best = min(best, time.perf_counter() - start)
+    return best, results
+
+
+def main():
+    pages = load_pages(sys.argv[1:])
+    if not pages:
+        print(f"No saved pages found (run a scraper to fill {CACHE_DIR}, or pass .html files).")
+        return 1
+    size = sum(len(p) for p in pages)
+    print(f"{len(pages)} pages, {size / 1024:.0f} KB of HTML, best of {REPEAT} runs")
+    legacy_s, legacy = bench(legacy_time, pages)
+    engine_s, engine = bench(time_extract.extract_event_time, pages)
+    print(f"  legacy cascade : {legacy_s * 1000:8.1f} ms  ({legacy_s / len(pages) * 1e6:.0f} µs/page)")
+    print(f"  single pass    : {engine_s * 1000:8.1f} ms  ({engine_s / len(pages) * 1e6:.0f} µs/page)")
+    print(f"  speedup        : {legacy_s / max(engine_s, 1e-9):.1f}x")
+    same = sum(1 for a, b in zip(legacy, engine) if a == b)
+    print(f"  same time found: {same}/{len(pages)}")
+    for a, b in zip(legacy, engine):
+        if a != b and a and b:
+            print(f"    differs: legacy {a!r} vs engine {b!r}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
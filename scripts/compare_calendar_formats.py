@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Compare events_by_day.json with its normalized form (calendar_store): file
+size raw and gzipped, time to load into the events_by_day shape, and a check
+that expanding the normalized file gives back exactly the same calendar.
+
+  python3 scripts/compare_calendar_formats.py
+  python3 scripts/compare_calendar_formats.py path/to/events_by_day.json
+"""
+import gzip
+import json
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import calendar_store  # noqa: E402
+
+REPEAT = 5
+
+
+def best_of(fn):
+    best = float("inf")
+    result = None
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    path = Path(sys.argv[1]) if len(sys.argv) > 1 else calendar_store.EVENTS_FILE
+    if not path.exists():
+        print(f"{path} not found (run update_calendar.py first).")
+        return 1
+    legacy_text = path.read_text(encoding="utf-8")
+    calendar = json.loads(legacy_text)
+    normalized = calendar_store.normalize(calendar)
+    normalized_text = json.dumps(normalized, ensure_ascii=False, separators=(",", ":"))
+
+    placements = sum(len(v) for v in calendar.values())
+    print(f"{path.name}: {len(calendar)} days, {placements} placements, {len(normalized['events'])} distinct events")
+    rows = [("legacy (indent=2)", legacy_text),
+            ("legacy (compact)", json.dumps(calendar, ensure_ascii=False, separators=(",", ":"))),
+            ("normalized", normalized_text)]
+    for label, text in rows:
+        raw = len(text.encode("utf-8"))
+        print(f"  {label:<18} {raw / 1024:9.1f} KB  gzip {len(gzip.compress(text.encode('utf-8'))) / 1024:8.1f} KB")
+
+    legacy_s, _ = best_of(lambda: json.loads(legacy_text))
+    norm_s, expanded = best_of(lambda: calendar_store.expand(json.loads(normalized_text)))
+    print(f"  load legacy        {legacy_s * 1000:9.1f} ms")
+    print(f"  load + expand      {norm_s * 1000:9.1f} ms")
+    same = expanded == calendar and list(expanded) == list(calendar)
+    print(f"  round trip identical: {'yes' if same else 'NO'}")
+    return 0 if same else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
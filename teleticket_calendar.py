@@ -7,6 +7,7 @@ import json
 import os
 import re
 import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 try:
@@ -19,12 +20,18 @@ except ImportError:
     import requests
     from bs4 import BeautifulSoup
 
-HEADERS = {
-    "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-    "Accept-Language": "es-PE,es;q=0.9,en;q=0.8",
-}
+import calendar_store
+import event_meta
+import file_store
+import http_client
+
 TELETICKET_URL = "https://teleticket.com.pe/todos"
 EVENTS_FILE = Path(__file__).resolve().parent / "events_by_day.json"
+# Listing pages fetched ahead in parallel, and where the last run's page count is kept
+PAGE_WINDOW = 4
+# Event detail pages fetched in parallel for time / og:image
+DETAIL_WORKERS = int(os.environ.get("TELETICKET_WORKERS", "8"))
+PAGES_STATE_FILE = Path(__file__).resolve().parent / ".cache" / "teleticket_pages.json"
 
 MES_A_NUM = {
     "enero": 1, "febrero": 2, "marzo": 3, "abril": 4, "mayo": 5, "junio": 6,
@@ -38,9 +45,9 @@ MES_LABEL = ["", "Ene", "Feb", "Mar", "Abr", "May", "Jun", "Jul", "Ago", "Sep",
 def fetch_teleticket_page(url=None):
     url = url or TELETICKET_URL
     try:
-        r = requests.get(url, headers=HEADERS, timeout=15)
-        r.raise_for_status()
-        return BeautifulSoup(r.text, "lxml")
+        return BeautifulSoup(http_client.get_text(url, timeout=15), "lxml")
+    except http_client.CircuitOpenError:
+        return None
     except Exception as e:
         print(f"  Error fetching {url}: {e}", file=__import__("sys").stderr)
         return None
@@ -51,22 +58,61 @@ def fetch_teleticket():
     return fetch_teleticket_page(TELETICKET_URL)
 
 
-def fetch_all_teleticket_pages(max_pages=20):
-    """Fetch /todos and /todos?page=2, ... until a page has no event links."""
+def _page_url(p):
+    return TELETICKET_URL if p == 1 else f"{TELETICKET_URL}?page={p}"
+
+
+def _has_event_links(soup):
+    links = soup.select('a[href*="teleticket.com.pe"]')
+    return any(is_event_link(a.get("href") or "") for a in links)
+
+
+def _load_page_count():
+    try:
+        with open(PAGES_STATE_FILE, "r", encoding="utf-8") as f:
+            return int(json.load(f).get("page_count", 0))
+    except (OSError, ValueError, AttributeError):
+        return 0
+
+
+def _save_page_count(count):
+    PAGES_STATE_FILE.parent.mkdir(parents=True, exist_ok=True)
+    file_store.atomic_write_json(PAGES_STATE_FILE, {"page_count": count})
+
+
+def fetch_all_teleticket_pages(max_pages=20, window=PAGE_WINDOW):
+    """
+    Fetch /todos and /todos?page=2, ... until a page has no event links.
+    Pages are fetched `window` at a time ahead of the one being checked, and
+    the previous run's page count is requested up front; pages speculatively
+    fetched past the end are cancelled or ignored. Returns the same soups, in
+    page order, as fetching one page after another.
+    """
     soups = []
-    for p in range(1, max_pages + 1):
-        url = TELETICKET_URL if p == 1 else f"{TELETICKET_URL}?page={p}"
-        soup = fetch_teleticket_page(url)
-        if not soup:
-            break
-        soups.append(soup)
-        # Stop if this page has no event links (pagination end)
-        links = soup.select('a[href*="teleticket.com.pe"]')
-        event_links = [a for a in links if is_event_link(a.get("href") or "")]
-        if p > 1 and not event_links:
-            break
-        if p > 1:
-            time.sleep(0.3)
+    futures = {}
+    pool = ThreadPoolExecutor(max_workers=max(window, 1))
+
+    def submit_through(last):
+        for page in range(len(futures) + 1, min(last, max_pages) + 1):
+            futures[page] = pool.submit(fetch_teleticket_page, _page_url(page))
+
+    try:
+        # Last run's pages plus the empty page that ended them
+        submit_through(max(window, _load_page_count() + 1))
+        for p in range(1, max_pages + 1):
+            submit_through(p + window - 1)
+            soup = futures[p].result()
+            if not soup:
+                break
+            soups.append(soup)
+            # Stop if this page has no event links (pagination end)
+            if p > 1 and not _has_event_links(soup):
+                break
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+    pages_with_events = len(soups) - (1 if len(soups) > 1 and not _has_event_links(soups[-1]) else 0)
+    if pages_with_events:
+        _save_page_count(pages_with_events)
     return soups
 
 
@@ -121,83 +167,42 @@ def date_range_to_keys(first_key, last_key):
     return out
 
 
-def _og_image_from_html(text):
-    """Extract og:image URL from HTML. Returns '' if not found."""
-    if not text:
-        return ""
-    # property then content, or content then property
-    m = re.search(r'property=["\']og:image["\'][^>]*content=["\']([^"\']+)["\']', text)
-    if m:
-        return m.group(1).strip()
-    m = re.search(r'content=["\']([^"\']+)["\'][^>]*property=["\']og:image["\']', text)
-    if m:
-        return m.group(1).strip()
-    return ""
+def fetch_event_time(event_url):
+    """Look up an event detail page's time and og:image. Returns (time_str, image_url)."""
+    meta = event_meta.lookup(event_url, ("time", "image"))
+    if not meta:
+        return "", ""
+    return meta["time"], meta["image"]
 
 
-def fetch_event_time(event_url):
-    """Fetch event detail page; extract time and og:image. Returns (time_str, image_url)."""
-    try:
-        r = requests.get(event_url, headers=HEADERS, timeout=12)
-        r.raise_for_status()
-        text = r.text
-        image_url = _og_image_from_html(text)
-
-        # "26-02-2026 20:00 Hrs." or "20:00 Hrs."
-        m = re.search(r"(\d{1,2}:\d{2})\s*[Hh]rs?\.?", text)
-        if m:
-            return _normalize_time(m.group(1)), image_url
-        # "Hora de inicio: ... 8:00 p.m." or "a las 8:00 p.m."
-        m = re.search(r"(?:inicio|comenzar|comienza|a las|las)\s+(\d{1,2}:\d{2}\s*[ap]\.?m\.?)", text, re.I)
-        if m:
-            return _normalize_time(m.group(1)), image_url
-        # "jue. 26 Febrero 20:00"
-        m = re.search(r"(?:lun|mar|mi[eé]|jue|vie|s[aá]b|dom)\.?\s+\d{1,2}\s+\w+\s+(\d{1,2}:\d{2})", text, re.I)
-        if m:
-            return _normalize_time(m.group(1)), image_url
-        # DD-MM-YYYY HH:MM or DD/MM/YYYY HH:MM
-        m = re.search(r"\d{1,2}[-/]\d{1,2}[-/]\d{2,4}\s+(\d{1,2}:\d{2})", text)
-        if m:
-            return _normalize_time(m.group(1)), image_url
-        # 12h format: 8:00 pm, 9:30 am
-        m = re.search(r"\b(\d{1,2}:\d{2}\s*[ap]\.?m\.?)\b", text, re.I)
-        if m:
-            return _normalize_time(m.group(1)), image_url
-        # 24h format near "horas" or time context
-        m = re.search(r"\b([0-2]?\d:\d{2})\s*(?:[Hh]rs?|[Hh]ora)?", text)
-        if m:
-            raw = m.group(1)
-            if re.match(r"^([0-2]?\d):(\d{2})$", raw):
-                h, mi = int(raw.split(":")[0]), raw.split(":")[1]
-                if 0 <= h <= 23 and 0 <= int(mi) <= 59:
-                    return _normalize_time(raw), image_url
-        # Fallback: any HH:MM (12h)
-        m = re.search(r"\b(0?[1-9]|1[0-2]):(\d{2})\s*([ap]\.?m\.?)?", text, re.I)
-        if m:
-            return _normalize_time(m.group(0).strip()), image_url
-        return "", image_url
-    except Exception:
-        pass
-    return "", ""
-
-
-def _normalize_time(t):
-    """Normalize to 12-hour AM/PM display, e.g. '8:00 pm', '10:00 am'."""
-    t = (t or "").strip()
-    m = re.match(r"(\d{1,2}):(\d{2})\s*([ap]\.?m\.?)?", t, re.I)
-    if not m:
-        return t
-    h, min_val, ampm = int(m.group(1)), m.group(2), (m.group(3) or "").strip().lower()
-    if ampm:
-        return f"{h}:{min_val} {ampm.replace('.', '')}".replace("am", "am").replace("pm", "pm")
-    # 24-hour to 12-hour
-    if h == 0:
-        return f"12:{min_val} am"
-    if h < 12:
-        return f"{h}:{min_val} am"
-    if h == 12:
-        return f"12:{min_val} pm"
-    return f"{h - 12}:{min_val} pm"
+def enrich_event_times(events, workers=DETAIL_WORKERS):
+    """
+    Fetch time and og:image for every unique event URL on a pool of `workers`
+    threads (paced per host by rate_limit) and apply them to all events with
+    that URL. Prints progress with pages/second.
+    """
+    by_url = {}
+    for ev in events:
+        if ev.get("url"):
+            by_url.setdefault(ev["url"], []).append(ev)
+    urls = list(by_url)
+    with_time = 0
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as pool:
+        for done, (url, (t, img)) in enumerate(zip(urls, pool.map(fetch_event_time, urls)), 1):
+            for ev in by_url[url]:
+                if t:
+                    ev["time"] = t
+                if img:
+                    ev["image_url"] = img
+            if t:
+                with_time += 1
+            if done % 15 == 0:
+                rate = done / max(time.monotonic() - started, 1e-6)
+                print(f"    Fetched {done}/{len(urls)} event pages ({rate:.1f}/s)...")
+    elapsed = time.monotonic() - started
+    print(f"  Got time for {with_time}/{len(urls)} Teleticket events in {elapsed:.1f}s "
+          f"({len(urls) / max(elapsed, 1e-6):.1f} pages/s)")
 
 
 def _make_ev(title, href, first_key, last_key, cat=""):
@@ -331,9 +336,16 @@ def scrape_teleticket_events(soup):
     return out
 
 
-def main():
+def collect():
+    """
+    Fetch every Teleticket listing page and event times; returns [(date_key, event)]
+    for merge(), or None if the first listing page could not be fetched.
+    """
     print("  Fetching Teleticket (all pages)...")
     soups = fetch_all_teleticket_pages()
+    if not soups:
+        print("  Teleticket listing could not be fetched; keeping the previous events")
+        return None
     raw_events = []
     for soup in soups:
         raw_events.extend(scrape_teleticket_events(soup))
@@ -357,40 +369,15 @@ def main():
 
     # Fetch time once per unique event (by URL)
     if not os.environ.get("SKIP_TELETICKET_FETCH"):
-        urls_done = set()
-        fetched = 0
-        for i, (_, ev) in enumerate(events_with_dates):
-            url = ev.get("url")
-            if not url or url in urls_done:
-                continue
-            urls_done.add(url)
-            if fetched > 0:
-                time.sleep(0.35)
-            t, img = fetch_event_time(url)
-            if t:
-                ev["time"] = t
-            if img:
-                ev["image_url"] = img
-            fetched += 1
-            if fetched % 15 == 0 and fetched > 0:
-                print(f"    Fetched time for {fetched} events...")
-        print(f"  Got time for {fetched}/{len(urls_done)} Teleticket events")
+        enrich_event_times([ev for _, _, ev in unique_raw])
     else:
         print("  Skipping per-event time fetch (SKIP_TELETICKET_FETCH=1)")
+    return events_with_dates
 
-    if not EVENTS_FILE.exists():
-        print(f"  {EVENTS_FILE} not found. Run enlima_calendar.py first.")
-        return
-
-    with open(EVENTS_FILE, "r", encoding="utf-8") as f:
-        events_by_day = json.load(f)
 
-    def is_teleticket_event(e):
-        u = e.get("url") or ""
-        return "teleticket.com.pe" in u
-
-    for date_key in list(events_by_day.keys()):
-        events_by_day[date_key] = [e for e in events_by_day[date_key] if not is_teleticket_event(e)]
+def merge(events_by_day, events_with_dates):
+    """Replace the Teleticket partition with these, in place; returns day placements merged."""
+    events_by_day.clear()
 
     added = 0
     for date_key, ev in events_with_dates:
@@ -398,10 +385,18 @@ def main():
             events_by_day[date_key] = []
         events_by_day[date_key].append(ev)
         added += 1
+    return added
+
 
-    with open(EVENTS_FILE, "w", encoding="utf-8") as f:
-        json.dump(events_by_day, f, ensure_ascii=False, indent=2)
+def main():
+    events_with_dates = collect()
+    if events_with_dates is None:
+        return
+    added = calendar_store.update_source("teleticket", lambda part: merge(part, events_with_dates))
+    calendar_store.write_view(EVENTS_FILE)
     print(f"  Merged {added} Teleticket dots into calendar. Wrote {EVENTS_FILE}")
+    event_meta.print_stats()
+    http_client.print_stats()
 
 
 if __name__ == "__main__":
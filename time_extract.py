@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Single-pass extraction of event times / dates from page text.
+
+A TimeExtractor holds an ordered list of strategies (regexes, best first). They
+are compiled into one combined pattern of zero-width lookaheads, so a single
+scan visits only the positions where some strategy matches. As with running
+the regexes one after another, each strategy's leftmost match decides it: if
+that match is rejected (its value is ''), the strategy is out and lower-ranked
+ones are considered, and the winner is the highest-ranked strategy whose
+leftmost match is accepted. An optional anchor
+(for times, the "H:MM" every strategy contains) limits that scan to short
+windows around anchor hits. For HTML,
+narrow_to_content() first cuts the page down to the visible text of <body>
+(no scripts, styles or comments), so CSS/JS timestamps are never candidates.
+
+Used by event_meta (Teleticket detail pages), monitor.extract_date_from_text
+and eventbrite_calendar's card times.
+"""
+import re
+from collections import namedtuple
+from html import unescape
+
+# name: label for callers; pattern: compiled regex; value: fn(match) -> str,
+# returning '' rejects the strategy's leftmost match, and with it the strategy
+Strategy = namedtuple("Strategy", "name pattern value")
+
+_BODY_RE = re.compile(r"<body\b[^>]*>(.*)</body>", re.I | re.S)
+_MAIN_RE = re.compile(r"<main\b[^>]*>(.*)</main>", re.I | re.S)
+_HIDDEN_RE = re.compile(r"<(script|style|noscript|template)\b.*?</\1\s*>|<!--.*?-->", re.I | re.S)
+_TAG_RE = re.compile(r"<[^>]+>")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def narrow_to_content(html):
+    """Visible text of the page's <main> (or <body>), without scripts, styles and tags."""
+    if not html:
+        return ""
+    m = _MAIN_RE.search(html) or _BODY_RE.search(html)
+    region = m.group(1) if m else html
+    region = _HIDDEN_RE.sub(" ", region)
+    region = _TAG_RE.sub(" ", region)
+    return _SPACE_RE.sub(" ", unescape(region)).strip()
+
+
+def strategy(name, pattern, flags=0, group=0, validate=None):
+    """Build a Strategy whose value is match.group(group) (stripped), optionally validated."""
+    compiled = re.compile(pattern, flags)
+
+    def value(m):
+        text = (m.group(group) or "").strip()
+        if validate and not validate(m):
+            return ""
+        return text
+
+    return Strategy(name, compiled, value)
+
+
+class TimeExtractor:
+    """
+    strategies: ordered best first. anchor: optional regex that every strategy
+    match contains (e.g. the HH:MM itself); when given, only windows of
+    `before`/`after` characters around anchor hits are scanned, which keeps long
+    pages cheap without changing the result.
+    """
+
+    def __init__(self, strategies, anchor=None, before=80, after=24):
+        self.strategies = list(strategies)
+        parts = []
+        for i, s in enumerate(self.strategies):
+            inline = "(?i:" if s.pattern.flags & re.I else "(?:"
+            parts.append(f"(?P<s{i}>{inline}{s.pattern.pattern}))")
+        self.combined = re.compile("(?=" + "|".join(parts) + ")")
+        self.anchor = re.compile(anchor) if isinstance(anchor, str) else anchor
+        self.before = before
+        self.after = after
+
+    def _windows(self, text):
+        if self.anchor is None:
+            yield 0, len(text)
+            return
+        lo = hi = None
+        for a in self.anchor.finditer(text):
+            start, end = max(a.start() - self.before, 0), min(a.end() + self.after, len(text))
+            if hi is not None and start <= hi:
+                hi = max(hi, end)
+                continue
+            if hi is not None:
+                yield lo, hi
+            lo, hi = start, end
+        if hi is not None:
+            yield lo, hi
+
+    @classmethod
+    def from_patterns(cls, patterns, **kwargs):
+        """Strategies from compiled regexes in priority order, each yielding group(0)."""
+        return cls((Strategy(f"p{i}", p, lambda m: m.group(0).strip()) for i, p in enumerate(patterns)),
+                   **kwargs)
+
+    def find(self, text):
+        """Return (strategy, value, match) for the best candidate in text, or (None, '', None)."""
+        if not text:
+            return None, "", None
+        # rank -> (value, match) of the strategy's leftmost match; value '' if rejected
+        decided = {}
+        best = len(self.strategies)
+        for lo, hi in self._windows(text):
+            for m in self.combined.finditer(text, lo, hi):
+                # The combined pattern reports the highest-ranked strategy matching
+                # here; lower-ranked ones may match at the same position too
+                for rank in range(int(m.lastgroup[1:]), best):
+                    if rank in decided:
+                        continue
+                    sm = self.strategies[rank].pattern.match(text, m.start(), hi)
+                    if not sm:
+                        continue
+                    value = self.strategies[rank].value(sm)
+                    decided[rank] = (value, sm)
+                    if value:
+                        best = rank
+                        break
+                if best < len(self.strategies) and all(r in decided for r in range(best)):
+                    value, sm = decided[best]
+                    return self.strategies[best], value, sm
+        if best == len(self.strategies):
+            return None, "", None
+        value, sm = decided[best]
+        return self.strategies[best], value, sm
+
+    def extract(self, text):
+        """Value of the best candidate in text, or ''."""
+        return self.find(text)[1]
+
+
+def normalize_time(t):
+    """Normalize to 12-hour AM/PM display, e.g. '8:00 pm', '10:00 am'."""
+    t = (t or "").strip()
+    m = re.match(r"(\d{1,2}):(\d{2})\s*([ap]\.?m\.?)?", t, re.I)
+    if not m:
+        return t
+    h, min_val, ampm = int(m.group(1)), m.group(2), (m.group(3) or "").strip().lower()
+    if ampm:
+        return f"{h}:{min_val} {ampm.replace('.', '')}"
+    # 24-hour to 12-hour
+    if h == 0:
+        return f"12:{min_val} am"
+    if h < 12:
+        return f"{h}:{min_val} am"
+    if h == 12:
+        return f"12:{min_val} pm"
+    return f"{h - 12}:{min_val} pm"
+
+
+def _valid_24h(m):
+    h, mi = m.group(1).split(":")
+    return 0 <= int(h) <= 23 and 0 <= int(mi) <= 59
+
+
+# Event start time on a detail page, best first
+EVENT_TIME = TimeExtractor([
+    # "26-02-2026 20:00 Hrs." or "20:00 Hrs."
+    strategy("hrs", r"(\d{1,2}:\d{2})\s*[Hh]rs?\.?", group=1),
+    # "Hora de inicio: ... 8:00 p.m." or "a las 8:00 p.m."
+    strategy("context", r"(?:inicio|comenzar|comienza|a las|las)\s+(\d{1,2}:\d{2}\s*[ap]\.?m\.?)", re.I, group=1),
+    # "jue. 26 Febrero 20:00"
+    strategy("weekday", r"(?:lun|mar|mi[eé]|jue|vie|s[aá]b|dom)\.?\s+\d{1,2}\s+\w+\s+(\d{1,2}:\d{2})", re.I, group=1),
+    # DD-MM-YYYY HH:MM or DD/MM/YYYY HH:MM
+    strategy("numeric_date", r"\d{1,2}[-/]\d{1,2}[-/]\d{2,4}\s+(\d{1,2}:\d{2})", group=1),
+    # 12h format: 8:00 pm, 9:30 am
+    strategy("ampm", r"\b(\d{1,2}:\d{2}\s*[ap]\.?m\.?)\b", re.I, group=1),
+    # 24h format near "horas" or time context
+    strategy("h24", r"\b([0-2]?\d:\d{2})\s*(?:[Hh]rs?|[Hh]ora)?", group=1, validate=_valid_24h),
+    # Fallback: any HH:MM (12h)
+    strategy("h12", r"\b(0?[1-9]|1[0-2]):(\d{2})\s*([ap]\.?m\.?)?", re.I),
+], anchor=r"\d:\d\d")
+
+
+def extract_event_time(html):
+    """Start time from an event detail page's HTML, normalized ('8:00 pm'), or ''."""
+    return normalize_time(EVENT_TIME.extract(narrow_to_content(html)))
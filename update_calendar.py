@@ -4,47 +4,109 @@ Run all calendar scrapers in order to refresh events_by_day.json.
 Use this for hourly updates: new events from EnLima, Eventbrite, and Teleticket
 are merged in; existing events from other sources are kept.
 
+Everything runs in this process: each source's collect() fetches and parses
+its events, its merge() replaces that source's partition (calendar_store). A
+source whose collect() raises or returns None (its listing could not be
+fetched, as opposed to fetched with no events) is not merged, so it keeps its
+partition from the previous run. The merged calendar is written once at the
+end. Time spent in each stage is printed.
+
+The three sources are separate hosts, so their collect() calls run at the same
+time on threads (each still paced by its host's rate limit); merging starts
+once all of them have finished, so a run takes about as long as the slowest
+source. --sequential collects them one after another instead.
+
 Usage:
   python3 update_calendar.py           # Full run (EnLima → Eventbrite → Teleticket)
-  SKIP_TELETICKET_FETCH=1 python3 update_calendar.py   # Skip per-event time fetch (faster, e.g. in CI)
+  python3 update_calendar.py --sequential   # Collect one source at a time
+  SKIP_TELETICKET_FETCH=1 python3 update_calendar.py   # Skip per-event time fetch (events get no times)
 """
-import os
-import subprocess
+import argparse
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+import calendar_store
+import enlima_calendar
+import event_meta
+import eventbrite_calendar
+import http_client
+import teleticket_calendar
+
 PROJECT_DIR = Path(__file__).resolve().parent
 EVENTS_FILE = PROJECT_DIR / "events_by_day.json"
 
-SCRIPTS = [
-    "enlima_calendar.py",
-    "eventbrite_calendar.py",
-    "teleticket_calendar.py",
-]
-
-
-def main():
-    # Ensure we have a base file so Eventbrite/Teleticket can merge (EnLima creates/merges it)
-    if not EVENTS_FILE.exists():
-        with open(EVENTS_FILE, "w", encoding="utf-8") as f:
-            f.write("{}")
-    for name in SCRIPTS:
-        script = PROJECT_DIR / name
-        if not script.exists():
-            print(f"  Skip (not found): {name}")
+
+def sources(enlima_partition):
+    """(name, partition, collect, merge) per source."""
+    return [
+        ("EnLima", "enlima", lambda: enlima_calendar.collect(events_by_day=enlima_partition),
+         enlima_calendar.merge),
+        ("Eventbrite", "eventbrite", eventbrite_calendar.collect, eventbrite_calendar.merge),
+        ("Teleticket", "teleticket", teleticket_calendar.collect, teleticket_calendar.merge),
+    ]
+
+
+def _timed_collect(name, collect):
+    """(result, seconds) for one source; None if it failed, which is reported, not raised."""
+    start = time.perf_counter()
+    try:
+        result = collect()
+    except Exception as e:
+        # Keep this source's events from the previous run
+        print(f"  Warning: {name} failed: {e}", file=sys.stderr)
+        result = None
+    return result, time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Refresh events_by_day.json from all sources")
+    parser.add_argument("--sequential", action="store_true",
+                        help="collect one source at a time instead of all at once")
+    args = parser.parse_args(argv)
+
+    timings = []
+    run_start = start = time.perf_counter()
+    # EnLima's crawl state is seeded from its partition
+    enlima_partition = calendar_store.load_partition("enlima")
+    timings.append(("load", time.perf_counter() - start))
+
+    stages = sources(enlima_partition)
+    start = time.perf_counter()
+    if args.sequential:
+        collected = []
+        for name, _, collect, _ in stages:
+            print(f"\n  Collecting {name} ...")
+            collected.append(_timed_collect(name, collect))
+    else:
+        print(f"\n  Collecting {', '.join(stage[0] for stage in stages)} concurrently ...")
+        with ThreadPoolExecutor(max_workers=len(stages)) as pool:
+            collected = list(pool.map(lambda stage: _timed_collect(stage[0], stage[2]), stages))
+    collect_wall = time.perf_counter() - start
+
+    # Merge barrier: every source has finished; each replaces only its own partition
+    print()
+    for (name, partition, _, merge), (result, seconds) in zip(stages, collected):
+        timings.append((name, seconds))
+        if result is None:
+            print(f"  Kept the previous {name} events ({name} could not be fetched)")
             continue
-        print(f"\n  Running {name} ...")
-        env = os.environ.copy()
-        # In CI or when set, Teleticket skips per-event page fetch (saves time; events still added, times may be empty)
-        if os.environ.get("SKIP_TELETICKET_FETCH") and "teleticket" in name:
-            env["SKIP_TELETICKET_FETCH"] = "1"
-        ret = subprocess.run(
-            [sys.executable, str(script)],
-            cwd=PROJECT_DIR,
-            env=env,
-        )
-        if ret.returncode != 0:
-            print(f"  Warning: {name} exited with {ret.returncode}")
+        start = time.perf_counter()
+        added = calendar_store.update_source(partition, lambda part: merge(part, result))
+        timings.append((f"merge {name}", time.perf_counter() - start))
+        print(f"  Merged {added} {name} events")
+
+    start = time.perf_counter()
+    calendar_store.write_view(EVENTS_FILE)
+    timings.append(("write", time.perf_counter() - start))
+    print(f"\n  Wrote {EVENTS_FILE}")
+
+    event_meta.print_stats()
+    http_client.print_stats()
+    print("  Timings: " + ", ".join(f"{stage} {seconds:.2f}s" for stage, seconds in timings))
+    print(f"  Collecting took {collect_wall:.2f}s ({'sequential' if args.sequential else 'concurrent'}), "
+          f"whole run {time.perf_counter() - run_start:.2f}s")
     print("\n  Calendar update finished.")
     return 0
 